@@ -0,0 +1,322 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from app.compression import Compressor, cached_levels
+from config.cache_config import CACHE_CONFIG
+from utils.logger import setup_logger
+from config.logging_config import CURRENT_LOGGING_CONFIG
+
+logger = setup_logger(
+    "layer_cache",
+    log_level=CURRENT_LOGGING_CONFIG["log_level"],
+    log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
+)
+
+# (layer ID, layer creation time, layer version, variant of the payload, e.g. its
+# simplification level)
+CacheKey = Tuple[int, str, int, str]
+
+# A payload compressed with each content coding, by coding
+CacheEntry = Dict[str, bytes]
+
+# File name suffix of each content coding in the cache directory
+SUFFIXES = {"gzip": ".json.gz", "br": ".json.br"}
+
+
+class LayerCache:
+    """
+    Cache of serialized layer payloads, precompressed, under a byte budget
+
+    Each payload is kept compressed with every content coding the server
+    offers (always including gzip), so it is compressed once per layer
+    version and sent as is to clients accepting one of them.
+
+    Entries are keyed by layer ID, creation time and version, so a changed
+    layer, or a new one given the ID of a deleted layer after a database
+    reset, is never served from the cache even where invalidation did not
+    reach (e.g. other processes); invalidating only frees the space early. The least recently
+    used entries are evicted once the budget is exceeded. With a directory,
+    payloads are also written there and reloaded on a memory miss, which
+    shares them between processes and keeps them across restarts.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entry_bytes: int,
+        directory: Optional[Union[str, Path]] = None,
+        disk_max_bytes: int = 0,
+        levels: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            max_bytes: Memory held by compressed payloads (0 disables the cache)
+            max_entry_bytes: Largest entry stored, all its codings together
+            directory: Directory payloads are also kept in
+            disk_max_bytes: Disk space used by the directory
+            levels: Compression level of each content coding (defaults to the configured ones)
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.directory = Path(directory) if directory else None
+        self.disk_max_bytes = disk_max_bytes
+        self.levels = levels or cached_levels()
+
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        if self.enabled and self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(
+        self, layer_id: int, created_at: datetime, version: int, variant: str = ""
+    ) -> Optional[CacheEntry]:
+        """
+        Get a cached payload
+
+        Args:
+            layer_id: ID of the layer
+            created_at: Creation time of the layer
+            version: Version of the layer
+            variant: Distinguishes payloads of the same version, e.g. their simplification level
+
+        Returns:
+            The payload by content coding, or None when it is not cached
+        """
+        if not self.enabled:
+            return None
+
+        key = (layer_id, created_at.isoformat(), version, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+
+        entry = self._read_files(key)
+        with self._lock:
+            self._stats["hits" if entry is not None else "misses"] += 1
+        if entry is not None:
+            self._store(key, entry)
+        return entry
+
+    def put(
+        self, layer_id: int, created_at: datetime, version: int, variant: str, entry: CacheEntry
+    ) -> bool:
+        """
+        Cache a payload compressed with one or more content codings
+
+        Args:
+            layer_id: ID of the layer
+            created_at: Creation time of the layer
+            version: Version of the layer
+            variant: Distinguishes payloads of the same version, e.g. their simplification level
+            entry: The payload by content coding; must include gzip
+
+        Returns:
+            Whether the payload was cached; those above max_entry_bytes are not
+        """
+        if not self.enabled or _entry_size(entry) > self.max_entry_bytes:
+            return False
+
+        key = (layer_id, created_at.isoformat(), version, variant)
+        self._store(key, entry)
+        self._write_files(key, entry)
+        return True
+
+    def writer(
+        self, layer_id: int, created_at: datetime, version: int, variant: str = ""
+    ) -> Optional["CacheWriter"]:
+        """Get a writer that compresses a payload as it is produced and caches it when closed"""
+        if not self.enabled:
+            return None
+        return CacheWriter(self, layer_id, created_at, version, variant)
+
+    def invalidate(self, layer_id: int) -> None:
+        """Drop every cached payload of a layer"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == layer_id]:
+                self._size -= _entry_size(self._entries.pop(key))
+
+        if self.directory:
+            for suffix in SUFFIXES.values():
+                for path in self.directory.glob(f"{layer_id}-*{suffix}"):
+                    _remove(path)
+
+    def clear(self) -> None:
+        """Drop every cached payload"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+        if self.directory and self.directory.exists():
+            for suffix in SUFFIXES.values():
+                for path in self.directory.glob(f"*{suffix}"):
+                    _remove(path)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the hit, miss and eviction counts and the memory used"""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._size}
+
+    def _store(self, key: CacheKey, entry: CacheEntry) -> None:
+        """Keep an entry in memory, evicting the least recently used ones over the budget"""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= _entry_size(previous)
+            self._entries[key] = entry
+            self._size += _entry_size(entry)
+
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= _entry_size(evicted)
+                self._stats["evictions"] += 1
+
+    def _path(self, key: CacheKey, encoding: str) -> Path:
+        layer_id, created_at, version, variant = key
+        digest = hashlib.md5(f"{created_at}|{variant}".encode()).hexdigest()
+        return self.directory / f"{layer_id}-{version}-{digest}{SUFFIXES[encoding]}"
+
+    def _read_files(self, key: CacheKey) -> Optional[CacheEntry]:
+        if not self.directory:
+            return None
+
+        entry = {}
+        for encoding in self.levels:
+            path = self._path(key, encoding)
+            try:
+                entry[encoding] = path.read_bytes()
+                os.utime(path)  # Most recently used, for the disk budget
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Failed to read cached payload {path}: {e}")
+        # Uncompressed responses are decompressed from the gzip payload
+        return entry if "gzip" in entry else None
+
+    def _write_files(self, key: CacheKey, entry: CacheEntry) -> None:
+        if not self.directory:
+            return
+
+        for encoding, payload in entry.items():
+            path = self._path(key, encoding)
+            temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+            try:
+                temp_path.write_bytes(payload)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write cached payload {path}: {e}")
+                _remove(temp_path)
+        self._trim_directory()
+
+    def _trim_directory(self) -> None:
+        """Delete the least recently used files beyond the disk budget"""
+        files = []
+        for suffix in SUFFIXES.values():
+            for path in self.directory.glob(f"*{suffix}"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.disk_max_bytes:
+                break
+            _remove(path)
+            size -= file_size
+
+
+class CacheWriter:
+    """
+    Compresses a payload as it is streamed out and caches it once complete
+
+    The payload is compressed with every coding of the cache at its cached
+    level, in the same pass that streams it to the first client. Payloads
+    that grow beyond the cache's max_entry_bytes are dropped as soon as
+    they do, and nothing is cached unless close() is called, so an
+    interrupted stream never leaves a partial payload behind.
+    """
+
+    def __init__(
+        self, cache: LayerCache, layer_id: int, created_at: datetime, version: int, variant: str
+    ):
+        self.cache = cache
+        self.layer = (layer_id, created_at, version, variant)
+        self._compressors = {
+            encoding: Compressor(encoding, level) for encoding, level in cache.levels.items()
+        }
+        self._parts = {encoding: [] for encoding in self._compressors}
+        self._size = 0
+
+    def write(self, data: Union[str, bytes]) -> None:
+        """Add the next piece of the payload"""
+        if self._compressors is None:
+            return
+
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        for encoding, compressor in self._compressors.items():
+            compressed = compressor.compress(data)
+            if compressed:
+                self._parts[encoding].append(compressed)
+                self._size += len(compressed)
+        if self._size > self.cache.max_entry_bytes:
+            self._compressors, self._parts = None, {}
+
+    def close(self) -> bool:
+        """
+        Finish the payload and cache it
+
+        Returns:
+            Whether the payload was cached
+        """
+        if self._compressors is None:
+            return False
+
+        entry = {
+            encoding: b"".join(self._parts[encoding]) + compressor.flush()
+            for encoding, compressor in self._compressors.items()
+        }
+        self._compressors, self._parts = None, {}
+        return self.cache.put(*self.layer, entry)
+
+
+def _entry_size(entry: CacheEntry) -> int:
+    return sum(len(payload) for payload in entry.values())
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to remove cached payload {path}: {e}")
+
+
+# Shared by every request handled by this process
+layer_cache = LayerCache(
+    max_bytes=CACHE_CONFIG["max_bytes"],
+    max_entry_bytes=CACHE_CONFIG["max_entry_bytes"],
+    directory=CACHE_CONFIG["directory"],
+    disk_max_bytes=CACHE_CONFIG["disk_max_bytes"],
+)
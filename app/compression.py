@@ -0,0 +1,115 @@
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Union
+from werkzeug.datastructures import Accept
+from config.compression_config import COMPRESSION_CONFIG
+from utils.logger import setup_logger
+from config.logging_config import CURRENT_LOGGING_CONFIG
+
+logger = setup_logger(
+    "compression",
+    log_level=CURRENT_LOGGING_CONFIG["log_level"],
+    log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
+)
+
+try:
+    import brotli
+except ImportError:
+    logger.warning("brotli is not installed, responses will only be compressed with gzip")
+    brotli = None
+
+# Content codings offered to clients, in order of preference
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+class Compressor:
+    """Incremental compressor for one content coding"""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        """
+        Initialize the compressor
+
+        Args:
+            encoding: "gzip" or "br"
+            level: Compression level (gzip) or quality (br); defaults to the configured one
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported content coding: {encoding}")
+        if level is None:
+            level = COMPRESSION_CONFIG["levels"][encoding]
+
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            # wbits=31 writes a gzip container rather than a bare zlib stream
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: Union[str, bytes]) -> bytes:
+        """Compress the next piece of data, returning whatever output is ready"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Finish the stream, returning the remaining output"""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def negotiate(accept_encodings: Accept, available: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """
+    Choose the content coding of a response from the request's Accept-Encoding
+
+    Args:
+        accept_encodings: The request's parsed Accept-Encoding header
+        available: Codings the response can be sent in, in order of preference
+
+    Returns:
+        The coding to use, or None to send the response uncompressed
+    """
+    return accept_encodings.best_match(
+        [encoding for encoding in available if encoding in ENCODINGS]
+    )
+
+
+def compress(data: Union[str, bytes], encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress data in one go"""
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    """Get the original bytes of compressed data"""
+    if encoding == "br":
+        return brotli.decompress(data)
+    return zlib.decompress(data, 47)  # Accept a gzip or zlib header
+
+
+def iter_compressed(chunks: Iterable[Union[str, bytes]], encoding: str) -> Iterator[bytes]:
+    """
+    Compress a stream of chunks on the fly
+
+    Compressed output is yielded as soon as the compressor produces it, so
+    the client receives the response progressively while memory stays flat.
+
+    Args:
+        chunks: Pieces of the response body
+        encoding: Content coding to compress with
+
+    Yields:
+        Pieces of the compressed body
+    """
+    compressor = Compressor(encoding)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def cached_levels() -> Dict[str, int]:
+    """Get the levels cached payloads are compressed with, for every available coding"""
+    return {encoding: COMPRESSION_CONFIG["cached_levels"][encoding] for encoding in ENCODINGS}
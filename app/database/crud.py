@@ -1,10 +1,88 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    cast,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    text,
+)
 from sqlalchemy.orm import Session
-from app.models.spatial import SpatialLayer, Feature, LayerAttribute, UploadHistory
+from app.models.spatial import (
+    SpatialLayer,
+    Feature,
+    FeatureSimplified,
+    LayerAttribute,
+    UploadHistory,
+)
+from geoalchemy2 import Geography
+from geoalchemy2.elements import WKBElement
 from geoalchemy2.shape import from_shape, to_shape
 from shapely.geometry import shape
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional, Iterable, Iterator, Tuple, Union
+import geopandas as gpd
+import csv
+import io
 import json
-from .utils import prepare_geometry_for_db
+from datetime import timedelta
+from config.ingest_config import INGEST_CONFIG
+from config.tile_config import TILE_CONFIG, simplify_tolerance
+from app.cache import layer_cache
+from .utils import prepare_geometry_for_db, prepare_feature_rows
+
+WRITE_MODES = ("insert", "append", "upsert")
+
+# Rows fetched at a time from server-side cursors when streaming features
+STREAM_BATCH_SIZE = 2000
+# Rows fetched at a time when exporting a layer, each becoming a columnar batch
+EXPORT_BATCH_SIZE = 50000
+
+# SQL casts of property text by the types get_layer_property_types reports
+_PROPERTY_CASTS = {
+    "integer": "::bigint",
+    "float": "::double precision",
+    "boolean": "::boolean",
+    "string": "",
+}
+
+
+# GeoJSON text of a feature, as built by feature_to_geojson: the feature ID is
+# added to the properties, which take precedence on a clash
+def _feature_geojson(geometry: str):
+    """GeoJSON text of a feature with the given geometry expression"""
+    return literal_column(
+        f"""'{{"type":"Feature","geometry":' || COALESCE(ST_AsGeoJSON({geometry}), 'null')"""
+        """ || ',"properties":' || (jsonb_build_object('id', features.id)"""
+        """ || COALESCE(features.properties, '{}')::jsonb)::text || '}'"""
+    )
+
+
+_FEATURE_GEOJSON = _feature_geojson("features.geometry")
+# The same with the feature's simplified geometry where one was stored
+_SIMPLIFIED_FEATURE_GEOJSON = _feature_geojson(
+    "COALESCE(feature_simplified.geometry, features.geometry)"
+)
+
+FEATURE_COLUMNS = ("layer_id", "feature_key", "feature_hash", "geometry", "properties")
+
+# Session-local table that batches are copied into before being merged into features
+_feature_staging = Table(
+    "feature_staging",
+    MetaData(),
+    Column("layer_id", Integer),
+    Column("feature_key", String),
+    Column("feature_hash", String(32)),
+    Column("geometry", Geography("GEOMETRY", srid=4326, spatial_index=False)),
+    Column("properties", String),
+    prefixes=["TEMPORARY"],
+)
 
 
 def create_spatial_layer(
@@ -18,6 +96,81 @@ def create_spatial_layer(
     return db_layer
 
 
+def update_layer_geometry_type(db: Session, layer_id: int, geometry_type: str) -> bool:
+    """Update the geometry type recorded for a layer"""
+    try:
+        layer = db.query(SpatialLayer).filter(SpatialLayer.id == layer_id).first()
+        if not layer:
+            return False
+
+        layer.geometry_type = geometry_type
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def clone_spatial_layer(
+    db: Session, layer_id: int, name: Optional[str] = None
+) -> Optional[SpatialLayer]:
+    """
+    Copy a layer and all of its features
+
+    Features are copied by a single INSERT ... SELECT, so they never leave
+    the database.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer to copy
+        name: Name for the copy (defaults to the source name with a "(copy)" suffix)
+
+    Returns:
+        The new layer, or None if the source layer does not exist
+    """
+    source = db.query(SpatialLayer).filter(SpatialLayer.id == layer_id).first()
+    if not source:
+        return None
+
+    try:
+        layer = SpatialLayer(
+            name=name or _copy_name(db, source.name),
+            description=source.description,
+            geometry_type=source.geometry_type,
+            srid=source.srid,
+            style=source.style,
+            key_column=source.key_column,
+        )
+        db.add(layer)
+        db.flush()
+
+        db.execute(
+            text(
+                "INSERT INTO features (layer_id, geometry, properties, feature_key, feature_hash) "
+                "SELECT :layer_id, geometry, properties, feature_key, feature_hash FROM features "
+                "WHERE layer_id = :source_id ORDER BY id"
+            ),
+            {"layer_id": layer.id, "source_id": layer_id},
+        )
+        db.commit()
+        build_simplified_geometries(db, layer.id)
+        db.refresh(layer)
+        return layer
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def _copy_name(db: Session, name: str) -> str:
+    """Find an unused layer name for a copy of the named layer"""
+    candidate = f"{name} (copy)"
+    number = 2
+    while db.query(SpatialLayer.id).filter(SpatialLayer.name == candidate).first():
+        candidate = f"{name} (copy {number})"
+        number += 1
+    return candidate
+
+
 def add_feature(db: Session, layer_id: int, geometry: dict, properties: dict) -> Feature:
     """Add a new feature to a layer"""
     try:
@@ -38,19 +191,665 @@ def add_feature(db: Session, layer_id: int, geometry: dict, properties: dict) ->
         raise e
 
 
+def add_features_bulk(
+    db: Session,
+    layer_id: int,
+    features: Union[gpd.GeoDataFrame, Iterable[gpd.GeoDataFrame]],
+    batch_size: int = INGEST_CONFIG["batch_size"],
+    on_batch: Optional[Callable[[int], None]] = None,
+    checkpoint: Optional[Callable[[int, int], None]] = None,
+    mode: str = "insert",
+    key_column: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Bulk load features into a layer inside a single transaction
+
+    Features are written in batches with PostgreSQL COPY when the psycopg2
+    driver is in use, falling back to multi-row INSERT statements otherwise.
+    Each batch runs inside a savepoint, so a failing batch is rolled back and
+    reported without discarding the batches that succeeded.
+
+    In "append" and "upsert" mode each batch is copied into a temporary
+    staging table and merged into the layer by one SQL statement that
+    compares per-feature hashes, so only new or changed features are
+    written. Append skips features identical to one already in the layer;
+    upsert matches features on key_column, inserting new keys and updating
+    features whose hash changed. Hashes missing from features stored before
+    they existed are computed first.
+
+    The key column is recorded on the layer; when a later load uses another
+    one, the layer's existing features are re-keyed from their properties.
+
+    When a checkpoint callback is given, the transaction is committed after
+    every batch together with whatever the callback records, so an
+    interrupted load can be resumed from the last committed batch.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer to add features to
+        features: GeoDataFrame, or an iterator of GeoDataFrame batches
+        batch_size: Maximum number of features written per batch
+        on_batch: Optional callback receiving the number of features written by each batch
+        checkpoint: Optional callback receiving (batch number, source rows consumed),
+            called inside the transaction before each per-batch commit
+        mode: "insert" (write every feature), "append" or "upsert"
+        key_column: Property identifying features; required for upsert
+
+    Returns:
+        Dictionary with inserted, updated, unchanged, failed and skipped counts
+        and per-batch failures
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError(f"Unknown write mode: {mode}")
+    if mode == "upsert" and not key_column:
+        raise ValueError("Upsert requires a key column")
+
+    result = {
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "failed": 0,
+        "skipped": 0,
+        "batches": 0,
+        "failures": [],
+    }
+    if isinstance(features, gpd.GeoDataFrame):
+        features = [features]
+
+    write_rows = _copy_feature_rows if _supports_copy(db) else _insert_feature_rows
+
+    rows_consumed = 0
+
+    try:
+        if mode == "append":
+            key_column = None
+        if key_column:
+            _sync_feature_keys(db, layer_id, key_column)
+        if mode != "insert":
+            _backfill_feature_hashes(db, layer_id)
+
+        for batch in _iter_feature_batches(features, batch_size):
+            batch_number = result["batches"]
+            result["batches"] += 1
+            rows_consumed += len(batch)
+
+            rows = prepare_feature_rows(batch, layer_id, key_column)
+            if mode == "upsert":
+                # Features without a key cannot be matched
+                rows = [row for row in rows if row[1] is not None]
+            result["skipped"] += len(batch) - len(rows)
+
+            if rows:
+                savepoint = db.begin_nested()
+                try:
+                    if mode == "insert":
+                        write_rows(db, rows)
+                        inserted, updated = len(rows), 0
+                    else:
+                        inserted, updated = _merge_feature_rows(
+                            db, layer_id, rows, mode, write_rows
+                        )
+                    savepoint.commit()
+                    result["inserted"] += inserted
+                    result["updated"] += updated
+                    result["unchanged"] += len(rows) - inserted - updated
+                    if on_batch:
+                        on_batch(len(rows))
+                except Exception as e:
+                    savepoint.rollback()
+                    result["failed"] += len(rows)
+                    result["failures"].append(
+                        {"batch": batch_number, "rows": len(rows), "error": str(e)}
+                    )
+
+            if checkpoint:
+                checkpoint(batch_number, rows_consumed)
+                db.commit()
+
+        db.commit()
+        return result
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def _iter_feature_batches(
+    features: Iterable[gpd.GeoDataFrame], batch_size: int
+) -> Iterator[gpd.GeoDataFrame]:
+    """Split GeoDataFrames into slices of at most batch_size rows"""
+    for gdf in features:
+        for start in range(0, len(gdf), batch_size):
+            yield gdf.iloc[start : start + batch_size]
+
+
+def _supports_copy(db: Session) -> bool:
+    """Check whether the session's driver supports COPY FROM STDIN"""
+    return db.get_bind().dialect.driver == "psycopg2"
+
+
+def _copy_feature_rows(db: Session, rows: list, table: Table = Feature.__table__) -> None:
+    """Write feature rows with COPY on the session's connection"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(FEATURE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_feature_rows(db: Session, rows: list, table: Table = Feature.__table__) -> None:
+    """Write feature rows with a single multi-row INSERT"""
+    db.execute(
+        insert(table).values(
+            [
+                {
+                    "layer_id": layer_id,
+                    "feature_key": feature_key,
+                    "feature_hash": feature_hash,
+                    "geometry": WKBElement(geometry, srid=4326, extended=True),
+                    "properties": properties,
+                }
+                for layer_id, feature_key, feature_hash, geometry, properties in rows
+            ]
+        )
+    )
+
+
+_MERGE_SQL = {
+    # Insert features not already present in the layer with identical content
+    "append": """
+        WITH staged AS (
+            SELECT DISTINCT ON (feature_hash) * FROM feature_staging ORDER BY feature_hash
+        ), inserted AS (
+            INSERT INTO features (layer_id, feature_key, feature_hash, geometry, properties)
+            SELECT :layer_id, s.feature_key, s.feature_hash, s.geometry, s.properties
+            FROM staged s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM features f
+                WHERE f.layer_id = :layer_id AND f.feature_hash = s.feature_hash
+            )
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM inserted), 0
+    """,
+    # Insert new keys and rewrite features whose hash changed; the last row wins per key
+    "upsert": """
+        WITH staged AS (
+            SELECT DISTINCT ON (feature_key) * FROM feature_staging
+            ORDER BY feature_key, position DESC
+        ), updated AS (
+            UPDATE features f
+            SET geometry = s.geometry, properties = s.properties, feature_hash = s.feature_hash
+            FROM staged s
+            WHERE f.layer_id = :layer_id AND f.feature_key = s.feature_key
+                AND f.feature_hash IS DISTINCT FROM s.feature_hash
+            RETURNING 1
+        ), inserted AS (
+            INSERT INTO features (layer_id, feature_key, feature_hash, geometry, properties)
+            SELECT :layer_id, s.feature_key, s.feature_hash, s.geometry, s.properties
+            FROM staged s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM features f
+                WHERE f.layer_id = :layer_id AND f.feature_key = s.feature_key
+            )
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM inserted), (SELECT count(*) FROM updated)
+    """,
+}
+
+
+def _merge_feature_rows(
+    db: Session, layer_id: int, rows: list, mode: str, write_rows: Callable
+) -> tuple:
+    """Stage a batch and merge it into the layer, returning (inserted, updated) counts"""
+    db.execute(
+        text(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS feature_staging "
+            "(position bigserial, layer_id integer, feature_key varchar, "
+            "feature_hash varchar(32), geometry geography(GEOMETRY, 4326), properties varchar)"
+        )
+    )
+    db.execute(text("TRUNCATE feature_staging RESTART IDENTITY"))
+    write_rows(db, rows, table=_feature_staging)
+
+    inserted, updated = db.execute(text(_MERGE_SQL[mode]), {"layer_id": layer_id}).one()
+    return inserted, updated
+
+
+def _sync_feature_keys(db: Session, layer_id: int, key_column: str) -> None:
+    """Derive a layer's feature keys from key_column, re-keying them all if it changed"""
+    layer = db.query(SpatialLayer).filter(SpatialLayer.id == layer_id).first()
+    rekey = layer is not None and layer.key_column != key_column
+    db.execute(
+        text(
+            "UPDATE features SET feature_key = properties::jsonb ->> :key_column "
+            "WHERE layer_id = :layer_id" + ("" if rekey else " AND feature_key IS NULL")
+        ),
+        {"layer_id": layer_id, "key_column": key_column},
+    )
+    if rekey:
+        layer.key_column = key_column
+        db.flush()
+
+
+def _backfill_feature_hashes(db: Session, layer_id: int) -> None:
+    """Compute the hashes missing from a layer's features, as prepare_feature_rows does"""
+    # MD5 of the uppercase hex EWKB and the stored properties text
+    db.execute(
+        text(
+            "UPDATE features SET feature_hash = md5("
+            "upper(encode(ST_AsEWKB(geometry::geometry), 'hex')) || '|' || properties) "
+            "WHERE layer_id = :layer_id AND feature_hash IS NULL"
+        ),
+        {"layer_id": layer_id},
+    )
+
+
+def build_simplified_geometries(db: Session, layer_id: int) -> int:
+    """
+    Rebuild the simplified geometries of a layer's lines and polygons
+
+    For every zoom level in TILE_CONFIG["simplify_zooms"], each geometry
+    is simplified with ST_SimplifyPreserveTopology at a tolerance of one
+    pixel at that zoom, entirely in the database. Only simplifications that
+    actually drop vertices are stored; readers fall back to the full
+    geometry otherwise. Points are never simplified.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer
+
+    Returns:
+        Number of simplified geometries stored
+    """
+    try:
+        db.execute(delete(FeatureSimplified).where(FeatureSimplified.layer_id == layer_id))
+
+        stored = 0
+        for zoom in TILE_CONFIG["simplify_zooms"]:
+            result = db.execute(
+                text(
+                    """
+                    INSERT INTO feature_simplified (feature_id, zoom, layer_id, geometry)
+                    SELECT id, :zoom, layer_id, simplified::geography
+                    FROM (
+                        SELECT id, layer_id, geometry::geometry AS original,
+                               ST_SimplifyPreserveTopology(geometry::geometry, :tolerance)
+                                   AS simplified
+                        FROM features
+                        WHERE layer_id = :layer_id AND ST_Dimension(geometry::geometry) > 0
+                    ) candidates
+                    WHERE ST_NPoints(simplified) < ST_NPoints(original)
+                    """
+                ),
+                {"layer_id": layer_id, "zoom": zoom, "tolerance": simplify_tolerance(zoom)},
+            )
+            stored += result.rowcount
+        db.commit()
+        return stored
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def bump_layer_version(db: Session, layer_id: int) -> None:
+    """
+    Record that a layer's features changed
+
+    Increments the layer's version and sets its updated_at, which the
+    layer endpoints derive their ETag and Last-Modified headers from, and
+    drops its cached payloads.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer
+    """
+    try:
+        db.query(SpatialLayer).filter(SpatialLayer.id == layer_id).update(
+            {SpatialLayer.version: SpatialLayer.version + 1, SpatialLayer.updated_at: func.now()},
+            synchronize_session=False,
+        )
+        db.commit()
+        layer_cache.invalidate(layer_id)
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
 def get_layer_by_name(db: Session, name: str) -> SpatialLayer:
     """Get a layer by name"""
     return db.query(SpatialLayer).filter(SpatialLayer.name == name).first()
 
 
-def get_layer_features(db: Session, layer_id: int) -> list[Feature]:
-    """Get all features for a layer"""
-    return db.query(Feature).filter(Feature.layer_id == layer_id).all()
+def get_layer_features(
+    db: Session,
+    layer_id: int,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    limit: Optional[int] = None,
+) -> list[Feature]:
+    """
+    Get the features of a layer, optionally only those within a bounding box
+
+    The bounding box filter is an ST_Intersects on the geography column,
+    so it is answered from the spatial index. Boxes 180 degrees wide or
+    more cannot be expressed as geography and return features regardless
+    of location.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer
+        bbox: (minx, miny, maxx, maxy) in longitude/latitude
+        limit: Most features to return
+
+    Returns:
+        List of features
+    """
+    query = db.query(Feature).filter(*_layer_filter(layer_id, bbox))
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def iter_layer_features_geojson(
+    db: Session,
+    layer_id: int,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    limit: Optional[int] = None,
+    simplify_zoom: Optional[int] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[str]:
+    """
+    Stream the features of a layer as GeoJSON text generated by PostGIS
+
+    Geometries are encoded by ST_AsGeoJSON and merged with their properties
+    and feature ID in SQL, so no geometry or property objects are built in
+    Python. Rows are read from a server-side cursor batch_size at a time, so
+    memory use does not depend on layer size; the session must stay open
+    until the iterator is exhausted. Features are filtered like
+    get_layer_features.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer
+        bbox: (minx, miny, maxx, maxy) in longitude/latitude
+        limit: Most features to return
+        simplify_zoom: Serve geometries simplified for this level of
+            TILE_CONFIG["simplify_zooms"] where stored (full resolution when None)
+        batch_size: Rows fetched from the cursor at a time
+
+    Yields:
+        GeoJSON Feature texts
+    """
+    if simplify_zoom is None:
+        query = select(_FEATURE_GEOJSON)
+    else:
+        query = select(_SIMPLIFIED_FEATURE_GEOJSON).select_from(
+            Feature.__table__.outerjoin(
+                FeatureSimplified.__table__,
+                and_(
+                    FeatureSimplified.feature_id == Feature.id,
+                    FeatureSimplified.zoom == simplify_zoom,
+                ),
+            )
+        )
+    query = (
+        query.where(*_layer_filter(layer_id, bbox))
+        .limit(limit)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    yield from db.execute(query).scalars()
+
+
+def get_layer_features_page(
+    db: Session, layer_id: int, after: Optional[int] = None, limit: int = 1000
+) -> List[Tuple[int, str]]:
+    """
+    Get a page of a layer's features in ID order, as GeoJSON text
+
+    Pages are selected by keyset: features with an ID greater than the last
+    one of the previous page, read from the (layer_id, id) index. Every page
+    costs the same however deep into the layer it is, and pages stay stable
+    while features are added.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer
+        after: ID of the last feature of the previous page (None for the first page)
+        limit: Most features to return
+
+    Returns:
+        List of (feature ID, GeoJSON Feature text) tuples
+    """
+    query = select(Feature.id, _FEATURE_GEOJSON).where(Feature.layer_id == layer_id)
+    if after is not None:
+        query = query.where(Feature.id > after)
+    query = query.order_by(Feature.id).limit(limit)
+    return [tuple(row) for row in db.execute(query)]
+
+
+def get_layer_property_types(db: Session, layer_id: int) -> Dict[str, str]:
+    """
+    Get the names and value types of a layer's feature properties
+
+    Types are inferred in the database from the JSON values of every
+    feature: "integer" or "float" for numbers (integer when all fit in 64
+    bits without a fraction), "boolean", or "string" for text and anything
+    else, including properties with values of several types.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer
+
+    Returns:
+        Property name to type, in the order properties first appear
+    """
+    rows = db.execute(
+        text(
+            """
+            SELECT key,
+                   array_agg(DISTINCT jsonb_typeof(value))
+                       FILTER (WHERE jsonb_typeof(value) <> 'null') AS kinds,
+                   bool_and(
+                       CASE WHEN jsonb_typeof(value) = 'number'
+                            THEN value::text ~ '^-?[0-9]{1,18}$' ELSE true END
+                   ) AS integral
+            FROM features, jsonb_each(features.properties::jsonb)
+            WHERE features.layer_id = :layer_id
+            GROUP BY key
+            ORDER BY min(features.id), key
+            """
+        ),
+        {"layer_id": layer_id},
+    )
+
+    property_types = {}
+    for key, kinds, integral in rows:
+        if kinds == ["number"]:
+            property_types[key] = "integer" if integral else "float"
+        elif kinds == ["boolean"]:
+            property_types[key] = "boolean"
+        else:
+            property_types[key] = "string"
+    return property_types
+
+
+def iter_layer_feature_rows(
+    db: Session,
+    layer_id: int,
+    property_types: Dict[str, str],
+    include_id: bool = True,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[List[tuple]]:
+    """
+    Stream a layer's features as rows of typed columns, in ID order
+
+    Properties are extracted from the JSON and cast in the database, and
+    geometries are returned as WKB, so rows can be turned into columnar
+    formats without parsing. Rows come from a server-side cursor.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer
+        property_types: Properties to return and their types, from get_layer_property_types
+        include_id: Whether rows start with the feature ID
+        batch_size: Rows fetched from the cursor at a time
+
+    Yields:
+        Batches of (id, *properties, WKB geometry) tuples
+    """
+    columns = ["f.id"] if include_id else []
+    params = {"layer_id": layer_id}
+    for index, (name, kind) in enumerate(property_types.items()):
+        params[f"key_{index}"] = name
+        columns.append(f"(p.properties ->> :key_{index}){_PROPERTY_CASTS[kind]}")
+    columns.append("ST_AsBinary(f.geometry::geometry)")
+
+    query = text(
+        f"""
+        SELECT {", ".join(columns)}
+        FROM features f CROSS JOIN LATERAL (SELECT f.properties::jsonb AS properties) p
+        WHERE f.layer_id = :layer_id
+        ORDER BY f.id
+        """
+    )
+    result = db.execute(
+        query, params, execution_options={"stream_results": True, "yield_per": batch_size}
+    )
+    for rows in result.partitions():
+        yield [tuple(row) for row in rows]
+
+
+def _layer_filter(layer_id: int, bbox: Optional[Tuple[float, float, float, float]]) -> list:
+    """Build the WHERE clauses selecting a layer's features, within a bounding box if given"""
+    clauses = [Feature.layer_id == layer_id]
+    if bbox is not None and bbox[2] - bbox[0] < 180:
+        clauses.append(func.ST_Intersects(Feature.geometry, _bbox_geography(bbox)))
+    return clauses
+
+
+def _bbox_geography(bbox: Tuple[float, float, float, float]):
+    """
+    Build a geography polygon for a longitude/latitude bounding box
+
+    Geography edges are great circles, so the box is densified to follow
+    its parallels instead of bulging toward the pole.
+    """
+    envelope = func.ST_MakeEnvelope(*bbox, 4326)
+    return cast(func.ST_Segmentize(envelope, 0.5), Geography(srid=4326))
+
+
+def get_layer_tile(
+    db: Session,
+    layer_id: int,
+    z: int,
+    x: int,
+    y: int,
+    limit: int,
+    attributes: Optional[List[str]] = None,
+    extent: int = 4096,
+    buffer: int = 64,
+    simplify_zoom: Optional[int] = None,
+) -> bytes:
+    """
+    Build a Mapbox Vector Tile of a layer's features in the database
+
+    Features are selected through the geometry index with the tile's
+    bounds (plus the buffer margin), clipped and quantized by ST_AsMVTGeom
+    and encoded by ST_AsMVT into a tile layer named layer_<id>, with the
+    feature ID as the MVT feature id. Requires PostGIS 3.1 or later.
+
+    Args:
+        db: Database session
+        layer_id: ID of the layer
+        z: Zoom level
+        x: Tile column
+        y: Tile row (XYZ scheme, 0 at the top)
+        limit: Most features to include in the tile
+        attributes: Property names to include (all when None, none when empty)
+        extent: Tile coordinate space
+        buffer: Margin around the tile, in tile units
+        simplify_zoom: Encode geometries simplified for this level of
+            TILE_CONFIG["simplify_zooms"] where stored (full resolution when None)
+
+    Returns:
+        The encoded tile, empty when no features fall within it
+    """
+    if attributes is None:
+        properties = ", f.properties::jsonb AS properties"
+    elif attributes:
+        properties = (
+            ", (SELECT jsonb_object_agg(key, value) FROM jsonb_each(f.properties::jsonb) "
+            "WHERE key = ANY(:attributes)) AS properties"
+        )
+    else:
+        properties = ""
+
+    # Geography edges are great circles, so the bounds are densified to follow
+    # the tile's parallels. Tiles at zoom 0 and 1 span 180 degrees or more and
+    # cannot be expressed as geography; they cover most of any layer anyway.
+    spatial_filter = "AND f.geometry && bounds.area" if z >= 2 else ""
+
+    if simplify_zoom is None:
+        geometry, simplified_join = "f.geometry", ""
+    else:
+        geometry = "COALESCE(s.geometry, f.geometry)"
+        simplified_join = (
+            "LEFT JOIN feature_simplified s ON s.feature_id = f.id AND s.zoom = :simplify_zoom"
+        )
+
+    query = text(
+        f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(:z, :x, :y) AS tile,
+                   ST_Segmentize(
+                       ST_Transform(ST_TileEnvelope(:z, :x, :y, margin => :margin), 4326), 0.5
+                   )::geography AS area
+        ),
+        tile_features AS (
+            SELECT f.id,
+                   ST_AsMVTGeom(
+                       ST_Transform({geometry}::geometry, 3857), bounds.tile, :extent, :buffer
+                   ) AS geom
+                   {properties}
+            FROM features f CROSS JOIN bounds {simplified_join}
+            WHERE f.layer_id = :layer_id {spatial_filter}
+            LIMIT :limit
+        )
+        SELECT ST_AsMVT(tile_features, :name, :extent, 'geom', 'id')
+        FROM tile_features
+        WHERE geom IS NOT NULL
+        """
+    )
+    params = {
+        "layer_id": layer_id,
+        "z": z,
+        "x": x,
+        "y": y,
+        "margin": buffer / extent,
+        "extent": extent,
+        "buffer": buffer,
+        "limit": limit,
+        "name": f"layer_{layer_id}",
+    }
+    if attributes:
+        params["attributes"] = list(attributes)
+    if simplify_zoom is not None:
+        params["simplify_zoom"] = simplify_zoom
+
+    tile = db.execute(query, params).scalar()
+    return bytes(tile) if tile else b""
 
 
 def get_all_layers(db: Session) -> list[SpatialLayer]:
-    """Get all spatial layers"""
-    return db.query(SpatialLayer).all()
+    """Get all spatial layers, ordered by ID"""
+    return db.query(SpatialLayer).order_by(SpatialLayer.id).all()
 
 
 def get_layer_by_id(db: Session, layer_id: int) -> SpatialLayer:
@@ -81,8 +880,10 @@ def update_layer_style(db: Session, layer_id: int, style_data: Dict[str, Any]) -
 
         # Update style properties
         layer.style = json.dumps(style_data)
+        layer.version = SpatialLayer.version + 1
 
         db.commit()
+        layer_cache.invalidate(layer_id)
         return True
     except Exception as e:
         db.rollback()
@@ -101,7 +902,8 @@ def delete_layer(db: Session, layer_id: int) -> bool:
         Boolean indicating success
     """
     try:
-        # Delete associated features first
+        # Delete associated features first, after their simplified geometries
+        db.query(FeatureSimplified).filter(FeatureSimplified.layer_id == layer_id).delete()
         db.query(Feature).filter(Feature.layer_id == layer_id).delete()
 
         # Delete layer attributes
@@ -116,6 +918,7 @@ def delete_layer(db: Session, layer_id: int) -> bool:
             db.delete(layer)
 
         db.commit()
+        layer_cache.invalidate(layer_id)
         return True
     except Exception as e:
         db.rollback()
@@ -140,3 +943,128 @@ def get_layer_style(db: Session, layer_id: int) -> Optional[Dict[str, Any]]:
         return None
     except Exception as e:
         raise e
+
+
+def create_upload_history(
+    db: Session,
+    filename: str,
+    file_type: str,
+    status: str = "processing",
+    content_hash: Optional[str] = None,
+) -> UploadHistory:
+    """Record a new upload"""
+    upload = UploadHistory(
+        filename=filename, file_type=file_type, status=status, content_hash=content_hash
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    return upload
+
+
+def record_upload_checkpoint(db: Session, upload_id: int, batch: int, rows: int) -> None:
+    """
+    Record the last committed batch of an upload without committing
+
+    The caller commits the checkpoint in the same transaction as the batch it
+    describes, so the two cannot disagree after a crash.
+    """
+    db.query(UploadHistory).filter(UploadHistory.id == upload_id).update(
+        {
+            UploadHistory.checkpoint_batch: batch,
+            UploadHistory.checkpoint_rows: rows,
+            # Also the job's heartbeat, see claim_upload
+            UploadHistory.updated_at: func.now(),
+        },
+        synchronize_session=False,
+    )
+
+
+def claim_upload(db: Session, upload_id: int, lease_seconds: int) -> bool:
+    """
+    Mark an upload as processing unless a live job already holds it
+
+    A job counts as live while its upload is "processing" and its record
+    was updated (by a checkpoint or progress report) within the lease. The
+    check and the update are one statement, so concurrent claims cannot
+    both succeed.
+
+    Args:
+        db: Database session
+        upload_id: ID of the upload
+        lease_seconds: Seconds without an update after which a job counts as dead
+
+    Returns:
+        Whether the upload was claimed
+    """
+    try:
+        last_seen = func.coalesce(UploadHistory.updated_at, UploadHistory.uploaded_at)
+        claimed = (
+            db.query(UploadHistory)
+            .filter(
+                UploadHistory.id == upload_id,
+                or_(
+                    UploadHistory.status != "processing",
+                    last_seen < func.now() - timedelta(seconds=lease_seconds),
+                ),
+            )
+            .update(
+                {
+                    UploadHistory.status: "processing",
+                    UploadHistory.error_message: None,
+                    UploadHistory.updated_at: func.now(),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return claimed == 1
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def get_upload_history(db: Session, upload_id: int) -> Optional[UploadHistory]:
+    """Get an upload record by ID"""
+    return db.query(UploadHistory).filter(UploadHistory.id == upload_id).first()
+
+
+def find_uploads_by_hash(db: Session, content_hash: str, file_type: str) -> List[UploadHistory]:
+    """Get successful uploads of the same type and content, most recent first"""
+    return (
+        db.query(UploadHistory)
+        .filter(
+            UploadHistory.content_hash == content_hash,
+            UploadHistory.file_type == file_type,
+            UploadHistory.status == "success",
+        )
+        .order_by(UploadHistory.id.desc())
+        .all()
+    )
+
+
+def update_upload_history(db: Session, upload_id: int, **fields) -> bool:
+    """
+    Update columns of an upload record
+
+    Args:
+        db: Database session
+        upload_id: ID of the upload to update
+        fields: Column values to set
+
+    Returns:
+        Boolean indicating success
+    """
+    try:
+        upload = db.query(UploadHistory).filter(UploadHistory.id == upload_id).first()
+        if not upload:
+            return False
+
+        for key, value in fields.items():
+            setattr(upload, key, value)
+
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        raise e
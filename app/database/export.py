@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+import pyarrow as pa
+from sqlalchemy.orm import Session
+from app.database import crud
+from app.models.spatial import SpatialLayer
+from tools.io.writers import (
+    EXPORT_FORMATS,
+    GEOMETRY_COLUMN,
+    feature_schema,
+    iter_features,
+    record_batches,
+    write_features,
+)
+from utils.logger import setup_logger
+from config.logging_config import CURRENT_LOGGING_CONFIG
+
+logger = setup_logger(
+    "layer_export",
+    log_level=CURRENT_LOGGING_CONFIG["log_level"],
+    log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
+)
+
+
+def iter_layer_export(db: Session, layer: SpatialLayer, fmt: str) -> Iterator[bytes]:
+    """
+    Export a layer in a binary format, yielding the file as it is written
+
+    Features are read from a server-side cursor in batches that each become
+    an Arrow record batch, so Arrow IPC and GeoParquet exports are streamed
+    with memory bounded by the batch size.
+
+    Args:
+        db: Database session
+        layer: Layer to export
+        fmt: One of EXPORT_FORMATS: "fgb", "parquet" or "arrow"
+
+    Yields:
+        Consecutive pieces of the exported file
+    """
+    schema, batches = _layer_batches(db, layer, fmt)
+    yield from iter_features(batches, schema, fmt)
+
+
+def write_layer_export(db: Session, layer: SpatialLayer, fmt: str, path: Union[str, Path]) -> None:
+    """
+    Export a layer in a binary format to a file
+
+    Args:
+        db: Database session
+        layer: Layer to export
+        fmt: One of EXPORT_FORMATS: "fgb", "parquet" or "arrow"
+        path: File to write
+    """
+    schema, batches = _layer_batches(db, layer, fmt)
+    if fmt == "fgb":
+        write_features(batches, schema, fmt, path)
+    else:
+        with open(path, "wb") as f:
+            write_features(batches, schema, fmt, f)
+
+
+def _layer_batches(
+    db: Session, layer: SpatialLayer, fmt: str
+) -> Tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """Get the schema of a layer's export and the record batches of its features"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    property_types = crud.get_layer_property_types(db, layer.id)
+    if GEOMETRY_COLUMN in property_types:
+        logger.warning(
+            f"Layer {layer.id} has a '{GEOMETRY_COLUMN}' property, which is not exported"
+        )
+        del property_types[GEOMETRY_COLUMN]
+    # As in the GeoJSON output, an "id" property takes the place of the feature ID
+    include_id = "id" not in property_types
+
+    schema = feature_schema(
+        property_types, layer.geometry_type, id_column="id" if include_id else None
+    )
+    rows = crud.iter_layer_feature_rows(db, layer.id, property_types, include_id=include_id)
+    return schema, record_batches(rows, schema)
@@ -1,5 +1,6 @@
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 from app.database.base import Base, engine
+from app.cache import layer_cache
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
 
@@ -14,6 +15,14 @@ def init_db():
     """Initialize the database"""
     try:
         Base.metadata.create_all(bind=engine)
+        # create_all skips existing tables, so add columns and indexes introduced since
+        add_missing_columns()
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(bind=engine, checkfirst=True)
+                except Exception as e:
+                    logger.warning(f"Could not create index {index.name}: {e}")
         logger.info("Database initialized successfully")
         return True
     except Exception as e:
@@ -21,6 +30,30 @@ def init_db():
         return False
 
 
+def add_missing_columns():
+    """Add model columns missing from existing tables, with their defaults"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                definition = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    definition += f" DEFAULT {column.server_default.arg}"
+                elif column.default is not None and column.default.is_scalar:
+                    definition += f" DEFAULT {column.default.arg!r}"
+                if not column.nullable and not column.primary_key:
+                    definition += " NOT NULL"
+
+                connection.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {definition}")
+                )
+                logger.info(f"Added column {table.name}.{column.name}")
+
+
 def truncate_tables():
     """Truncate all tables in the database"""
     try:
@@ -45,6 +78,7 @@ def truncate_tables():
 
                 # Truncate all tables
                 connection.execute(text("TRUNCATE TABLE spatial_layers CASCADE"))
+                connection.execute(text("TRUNCATE TABLE feature_simplified CASCADE"))
                 connection.execute(text("TRUNCATE TABLE features CASCADE"))
                 connection.execute(text("TRUNCATE TABLE layer_attributes CASCADE"))
                 connection.execute(text("TRUNCATE TABLE upload_history CASCADE"))
@@ -78,6 +112,7 @@ def truncate_tables():
                     )
                 )
 
+        layer_cache.clear()
         logger.info("Successfully truncated all tables")
         return True
     except Exception as e:
@@ -95,6 +130,7 @@ def reset_database():
         # Recreate all tables
         Base.metadata.create_all(bind=engine)
         logger.info("Successfully recreated all tables")
+        layer_cache.clear()
 
         return True
     except Exception as e:
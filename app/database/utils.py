@@ -1,8 +1,21 @@
 from geoalchemy2.shape import to_shape, from_shape
 from shapely.geometry import mapping
+import geopandas as gpd
+import pandas as pd
+import numpy as np
+import shapely
+import hashlib
 import json
+import orjson
+from typing import Any, Dict, Iterable, Iterator, Optional
 from tools.conversion.geometry_converter import convert_to_2d
 
+# Characters buffered before a piece of a streamed response is written
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# orjson options for feature properties: numpy values and non-string keys are accepted
+_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
 
 def feature_to_geojson(feature):
     """Convert a database feature to GeoJSON"""
@@ -28,6 +41,49 @@ def features_to_geojson(features):
     }
 
 
+def iter_geojson_feature_collection(
+    features: Iterable[str],
+    limit: Optional[int] = None,
+    members: Optional[Dict[str, Any]] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Stream a GeoJSON FeatureCollection from features already encoded as text
+
+    Features are written out as they are consumed, grouped into chunks of
+    about chunk_size characters. When a limit is given, at most limit
+    features are written and the collection's "truncated" member tells
+    whether there were more.
+
+    Args:
+        features: GeoJSON Feature texts, e.g. from crud.iter_layer_features_geojson
+        limit: Most features to write
+        members: Additional top-level members, written after the features
+        chunk_size: Approximate size of each chunk yielded
+
+    Yields:
+        Consecutive pieces of the FeatureCollection's JSON text
+    """
+    chunk = ['{"type":"FeatureCollection","features":[']
+    size = 0
+    truncated = False
+    for count, feature in enumerate(features):
+        if limit is not None and count >= limit:
+            truncated = True
+            break
+        chunk.append(feature if count == 0 else "," + feature)
+        size += len(feature)
+        if size >= chunk_size:
+            yield "".join(chunk)
+            chunk, size = [], 0
+
+    chunk.append(f'],"truncated":{"true" if truncated else "false"}')
+    for name, value in (members or {}).items():
+        chunk.append(f",{orjson.dumps(name).decode()}:{orjson.dumps(value).decode()}")
+    chunk.append("}")
+    yield "".join(chunk)
+
+
 def prepare_geometry_for_db(geometry):
     """
     Prepare a geometry for database storage by ensuring it's 2D.
@@ -43,3 +99,130 @@ def prepare_geometry_for_db(geometry):
 
     # Convert to WKB format for database storage
     return from_shape(geometry_2d)
+
+
+def prepare_geometries_for_db(geometries: gpd.GeoSeries, srid: int = 4326) -> list:
+    """
+    Prepare a GeoSeries for bulk database storage by ensuring it's 2D.
+
+    Args:
+        geometries: GeoSeries of Shapely geometries
+        srid: SRID embedded in the encoded geometries
+
+    Returns:
+        List of hex-encoded EWKB strings ready for COPY or INSERT
+    """
+    values = convert_to_2d(np.asarray(geometries.values, dtype=object))
+    values = shapely.set_srid(values, srid)
+    return shapely.to_wkb(values, hex=True, include_srid=True).tolist()
+
+
+def serialize_properties(properties: pd.DataFrame) -> list:
+    """
+    Serialize the attribute columns of a DataFrame to one JSON string per row.
+
+    Cleaning happens column-wise: NaN, NA and infinite values become null,
+    datetimes become ISO 8601 strings and numpy scalars become native Python
+    values. Values that still cannot be serialized to JSON are stored as null.
+
+    Args:
+        properties: DataFrame of feature attributes (without geometry)
+
+    Returns:
+        List of JSON strings, one per row
+    """
+    if properties.shape[1] == 0:
+        return ["{}"] * len(properties)
+
+    names = [str(name) for name in properties.columns]
+    columns = [_clean_property_column(properties.iloc[:, i]) for i in range(properties.shape[1])]
+
+    return [
+        orjson.dumps(dict(zip(names, row)), default=_json_default, option=_JSON_OPTIONS).decode()
+        for row in zip(*columns)
+    ]
+
+
+def _json_default(value):
+    """Fallback serializer for values orjson does not handle natively"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return None
+
+
+def _clean_property_column(column: pd.Series) -> list:
+    """Convert a property column to a list of JSON-ready Python values"""
+    missing = column.isna().to_numpy(copy=True)
+
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        suffix = ""
+        if column.dt.tz is not None:
+            column = column.dt.tz_convert("UTC").dt.tz_localize(None)
+            suffix = "Z"
+        unit = "us" if (column.dt.microsecond.fillna(0) != 0).any() else "s"
+        values = np.datetime_as_string(column.to_numpy(dtype="datetime64[us]"), unit=unit)
+        values = np.char.add(values, suffix).astype(object)
+    elif pd.api.types.is_float_dtype(column.dtype) and not pd.api.types.is_extension_array_dtype(
+        column.dtype
+    ):
+        values = column.to_numpy(dtype=float)
+        missing |= ~np.isfinite(values)
+        values = values.astype(object)
+    elif (
+        pd.api.types.is_integer_dtype(column.dtype) or pd.api.types.is_bool_dtype(column.dtype)
+    ) and not pd.api.types.is_extension_array_dtype(column.dtype):
+        return column.tolist()
+    else:
+        values = column.to_numpy(dtype=object, copy=True)
+
+    values[missing] = None
+    return values.tolist()
+
+
+def prepare_feature_rows(gdf: gpd.GeoDataFrame, layer_id: int, key_column: str = None) -> list:
+    """
+    Build (layer_id, feature_key, feature_hash, geometry, properties) rows for
+    bulk loading a GeoDataFrame.
+
+    The hash covers the encoded geometry and properties, so two rows hash
+    equally exactly when they would be stored identically. The key is the
+    value of key_column as PostgreSQL's ->> operator would return it from
+    the stored properties. Features without a geometry are dropped.
+
+    Args:
+        gdf: GeoDataFrame of features
+        layer_id: ID of the layer the features belong to
+        key_column: Optional property column identifying features
+
+    Returns:
+        List of row tuples ready for COPY or INSERT
+    """
+    gdf = gdf[~(gdf.geometry.isna() | gdf.geometry.is_empty)]
+    if gdf.empty:
+        return []
+
+    geometries = prepare_geometries_for_db(gdf.geometry)
+    properties = serialize_properties(gdf.drop(columns=gdf.geometry.name))
+    hashes = [
+        hashlib.md5(f"{geom}|{props}".encode()).hexdigest()
+        for geom, props in zip(geometries, properties)
+    ]
+
+    if key_column is not None:
+        if key_column not in gdf.columns:
+            raise KeyError(f"Key column '{key_column}' not found")
+        keys = [_key_text(value) for value in _clean_property_column(gdf[key_column])]
+    else:
+        keys = [None] * len(gdf)
+
+    return [
+        (layer_id, key, feature_hash, geom, props)
+        for key, feature_hash, geom, props in zip(keys, hashes, geometries, properties)
+    ]
+
+
+def _key_text(value):
+    """Render a cleaned property value the way PostgreSQL's jsonb ->> operator does"""
+    if value is None or isinstance(value, str):
+        return value
+    return orjson.dumps(value, default=_json_default, option=_JSON_OPTIONS).decode()
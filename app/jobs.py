@@ -0,0 +1,394 @@
+import shutil
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from werkzeug.utils import secure_filename
+from app.database.base import SessionLocal
+from app.database import crud
+from processors.factory import DataProcessorFactory
+from config.ingest_config import INGEST_CONFIG
+from tools.io.uploads import InMemoryFile, StagedFile, content_hash, upload_size
+from utils.logger import setup_logger
+from config.logging_config import CURRENT_LOGGING_CONFIG
+
+logger = setup_logger(
+    "ingest_jobs",
+    log_level=CURRENT_LOGGING_CONFIG["log_level"],
+    log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
+)
+
+JOB_DIR = Path(INGEST_CONFIG["job_dir"])
+
+# Single-layer uploads can continue from a checkpoint; GeoPackages write several layers
+RESUMABLE_TYPES = {"shapefile", "csv", "geojson"}
+
+DUPLICATE_ACTIONS = {"ingest", "reuse", "clone"}
+
+# Job options applied to the processor rather than passed to process_data
+PROCESSOR_OPTIONS = ("write_mode", "key_column")
+
+# Options that only name or tune a job, leaving the layers it creates unchanged
+UNHASHED_OPTIONS = ("layer_name", "description", "max_workers")
+
+_executor = ThreadPoolExecutor(
+    max_workers=INGEST_CONFIG["job_workers"], thread_name_prefix="ingest-job"
+)
+
+
+def submit_upload_job(
+    file_type: str,
+    files: Dict[str, Any],
+    options: Dict[str, Any],
+    on_duplicate: Optional[str] = None,
+) -> int:
+    """
+    Stage uploaded files and queue them for background processing
+
+    Every upload is fingerprinted with a hash of its contents and of the
+    options that shape its layers. When it matches an earlier successful
+    upload of the same type, on_duplicate decides whether to ingest it
+    again, reuse the existing layers, or clone them inside the database.
+
+    Uploads up to the in-memory threshold are held in memory and handed to
+    the processor directly; larger ones are staged on disk, which also makes
+    the job resumable.
+
+    Args:
+        file_type: Processor type registered in DataProcessorFactory
+        files: Mapping of form field name to uploaded FileStorage
+        options: Keyword arguments passed to the processor's process_data
+        on_duplicate: "ingest", "reuse" or "clone" (defaults to DUPLICATE_UPLOADS)
+
+    Returns:
+        ID of the UploadHistory record tracking the job
+    """
+    on_duplicate = on_duplicate or INGEST_CONFIG["on_duplicate"]
+    if options.get("write_mode", "insert") != "insert":
+        # Appends and upserts change an existing layer, so they are never short-circuited
+        on_duplicate = "ingest"
+    if on_duplicate not in DUPLICATE_ACTIONS:
+        raise ValueError(f"Unknown duplicate upload action: {on_duplicate}")
+
+    filenames = ", ".join(f.filename for f in files.values() if f.filename)
+    fingerprint = content_hash(
+        files, {key: value for key, value in options.items() if key not in UNHASHED_OPTIONS}
+    )
+
+    db = SessionLocal()
+    try:
+        upload = crud.create_upload_history(
+            db, filename=filenames, file_type=file_type, content_hash=fingerprint
+        )
+        upload_id = upload.id
+
+        duplicate = None
+        if on_duplicate != "ingest":
+            duplicate = _find_duplicate(db, fingerprint, file_type, exclude_id=upload_id)
+    finally:
+        db.close()
+
+    if duplicate:
+        previous_id, previous_result = duplicate
+        if on_duplicate == "reuse":
+            logger.info(f"Upload {upload_id} matches upload {previous_id}, reusing its layers")
+            _finish_job(
+                upload_id,
+                {
+                    **previous_result,
+                    "message": f"Identical to upload {previous_id}; existing layers reused",
+                    "duplicate_of": previous_id,
+                },
+            )
+            return upload_id
+
+        _executor.submit(
+            _run_clone_job, upload_id, previous_id, previous_result, options.get("layer_name")
+        )
+        logger.info(f"Queued clone of upload {previous_id} as job {upload_id}")
+        return upload_id
+
+    sizes = [upload_size(storage) for storage in files.values()]
+    if None not in sizes and sum(sizes) <= INGEST_CONFIG["in_memory_threshold"]:
+        buffered = {
+            key: InMemoryFile(storage.filename or key, storage.read())
+            for key, storage in files.items()
+        }
+        _executor.submit(_run_upload_job, upload_id, file_type, buffered, options)
+        logger.info(f"Queued in-memory {file_type} upload job {upload_id}")
+        return upload_id
+
+    job_dir = JOB_DIR / str(upload_id)
+    job_dir.mkdir(parents=True, exist_ok=True)
+
+    staged = {}
+    for key, storage in files.items():
+        path = job_dir / f"{key}_{secure_filename(storage.filename or key)}"
+        storage.save(path)
+        staged[key] = path
+
+    # Keep enough to restart the job from its staged files
+    db = SessionLocal()
+    try:
+        crud.update_upload_history(
+            db,
+            upload_id,
+            source_path=str(job_dir),
+            options=orjson.dumps(
+                {"files": {key: path.name for key, path in staged.items()}, "options": options}
+            ).decode(),
+        )
+    finally:
+        db.close()
+
+    staged_files = {key: StagedFile(path) for key, path in staged.items()}
+    _executor.submit(_run_upload_job, upload_id, file_type, staged_files, options)
+    logger.info(f"Queued {file_type} upload job {upload_id}")
+    return upload_id
+
+
+def get_job_status(upload_id: int) -> Dict[str, Any]:
+    """Return the status of an upload job, or None if it does not exist"""
+    db = SessionLocal()
+    try:
+        upload = crud.get_upload_history(db, upload_id)
+        if not upload:
+            return None
+
+        return {
+            "id": upload.id,
+            "filename": upload.filename,
+            "file_type": upload.file_type,
+            "status": upload.status,
+            "features_processed": upload.features_processed or 0,
+            "layer_id": upload.layer_id,
+            "error": upload.error_message,
+            "result": orjson.loads(upload.result) if upload.result else None,
+            "uploaded_at": upload.uploaded_at.isoformat() if upload.uploaded_at else None,
+            "updated_at": upload.updated_at.isoformat() if upload.updated_at else None,
+        }
+    finally:
+        db.close()
+
+
+def resume_upload_job(upload_id: int) -> Dict[str, Any]:
+    """
+    Continue an interrupted upload from its last committed batch
+
+    Runs in the calling thread. The staged files are reused, the layer that
+    was being written is reopened and source rows already committed are
+    skipped. An upload whose job made progress within the job lease is
+    taken to be still running and is not resumed.
+
+    Args:
+        upload_id: ID of the UploadHistory record of the interrupted upload
+
+    Returns:
+        Processing summary in the same shape as process_data
+    """
+    db = SessionLocal()
+    try:
+        upload = crud.get_upload_history(db, upload_id)
+        if not upload:
+            return {"success": False, "error": f"Upload {upload_id} not found"}
+        if upload.status == "success":
+            return {"success": False, "error": f"Upload {upload_id} already completed"}
+        if upload.file_type not in RESUMABLE_TYPES:
+            return {
+                "success": False,
+                "error": f"Resuming {upload.file_type} uploads is not supported",
+            }
+        if not upload.source_path or not upload.options:
+            return {"success": False, "error": f"Upload {upload_id} has no staged files"}
+
+        job = orjson.loads(upload.options)
+        staged = {
+            key: StagedFile(Path(upload.source_path) / name) for key, name in job["files"].items()
+        }
+        missing = [str(file.path) for file in staged.values() if not file.path.exists()]
+        if missing:
+            return {"success": False, "error": f"Staged files missing: {', '.join(missing)}"}
+
+        file_type = upload.file_type
+        features_processed = upload.features_processed or 0
+        resume_from = {
+            "layer_id": upload.layer_id,
+            "batch": upload.checkpoint_batch or 0,
+            "rows": upload.checkpoint_rows or 0,
+        }
+        if not crud.claim_upload(db, upload_id, INGEST_CONFIG["job_lease"]):
+            return {
+                "success": False,
+                "error": f"Upload {upload_id} is still being processed by a running job",
+            }
+    finally:
+        db.close()
+
+    logger.info(f"Resuming upload job {upload_id} from batch {resume_from['batch']}")
+    return _run_upload_job(
+        upload_id,
+        file_type,
+        staged,
+        job["options"],
+        resume_from=resume_from,
+        features_processed=features_processed,
+    )
+
+
+def _run_upload_job(
+    upload_id: int,
+    file_type: str,
+    files: Dict[str, Any],
+    options: Dict[str, Any],
+    resume_from: Optional[Dict[str, int]] = None,
+    features_processed: int = 0,
+) -> Dict[str, Any]:
+    """Process an upload's staged or in-memory files and record the outcome"""
+    db = SessionLocal()
+    try:
+        processor = DataProcessorFactory.get_processor(file_type)
+        processor.upload_id = upload_id
+        processor.resume_from = resume_from
+        processor.features_processed = features_processed
+        processor.progress_callback = lambda count: _record_progress(upload_id, count)
+
+        options = dict(options)
+        for key in PROCESSOR_OPTIONS:
+            value = options.pop(key, None)
+            if value:
+                setattr(processor, key, value)
+
+        result = processor.process_data(
+            files=files,
+            db_session=db,
+            **options,
+        )
+        if result.get("success") and processor.write_mode != "insert":
+            result["write_stats"] = processor.write_stats
+    except Exception as e:
+        logger.error(f"Upload job {upload_id} failed: {e}", exc_info=True)
+        result = {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+    _finish_job(upload_id, result)
+
+    # Staged files are kept after a failure only when the job can be resumed
+    if result.get("success") or not _can_resume(upload_id, file_type):
+        shutil.rmtree(JOB_DIR / str(upload_id), ignore_errors=True)
+    return result
+
+
+def _can_resume(upload_id: int, file_type: str) -> bool:
+    """Check whether a failed upload committed batches it could be resumed after"""
+    if file_type not in RESUMABLE_TYPES:
+        return False
+
+    # Failures before the first batch (e.g. validation errors) would only fail again
+    db = SessionLocal()
+    try:
+        upload = crud.get_upload_history(db, upload_id)
+        return bool(upload and upload.source_path and upload.checkpoint_batch)
+    finally:
+        db.close()
+
+
+def _find_duplicate(
+    db, fingerprint: str, file_type: str, exclude_id: int
+) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """Find the latest earlier upload with the same content whose layers still exist"""
+    for upload in crud.find_uploads_by_hash(db, fingerprint, file_type):
+        if upload.id == exclude_id or not upload.result:
+            continue
+        result = orjson.loads(upload.result)
+        layer_ids = _result_layer_ids(result)
+        if layer_ids and all(crud.get_layer_by_id(db, layer_id) for layer_id in layer_ids):
+            return upload.id, result
+    return None
+
+
+def _result_layer_ids(result: Dict[str, Any]) -> List[int]:
+    """Get the IDs of the layers an upload created from its processing summary"""
+    if "processed_layers" in result:
+        return [layer["layer_id"] for layer in result["processed_layers"] if layer.get("success")]
+    return [result["layer_id"]] if result.get("layer_id") else []
+
+
+def _run_clone_job(
+    upload_id: int,
+    source_upload_id: int,
+    source_result: Dict[str, Any],
+    layer_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Copy the layers of an identical earlier upload instead of ingesting again"""
+    db = SessionLocal()
+    try:
+        # A requested layer name applies to single-layer uploads when it is still free
+        single = "processed_layers" not in source_result
+        if not single or (layer_name and crud.get_layer_by_name(db, layer_name)):
+            layer_name = None
+
+        clones = {}
+        for layer_id in _result_layer_ids(source_result):
+            layer = crud.clone_spatial_layer(db, layer_id, name=layer_name)
+            if layer is None:
+                raise ValueError(f"Layer {layer_id} no longer exists")
+            clones[layer_id] = layer
+
+        result = {
+            **source_result,
+            "message": f"Identical to upload {source_upload_id}; layers copied",
+            "cloned_from": source_upload_id,
+        }
+        if not single:
+            result["processed_layers"] = [
+                (
+                    {
+                        **layer,
+                        "layer_id": clones[layer["layer_id"]].id,
+                        "layer_name": clones[layer["layer_id"]].name,
+                    }
+                    if layer.get("success")
+                    else layer
+                )
+                for layer in source_result["processed_layers"]
+            ]
+        else:
+            clone = clones[source_result["layer_id"]]
+            result.update(layer_id=clone.id, layer_name=clone.name)
+    except Exception as e:
+        logger.error(f"Clone job {upload_id} failed: {e}", exc_info=True)
+        result = {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+    _finish_job(upload_id, result)
+    return result
+
+
+def _record_progress(upload_id: int, features_processed: int) -> None:
+    """Store job progress using a separate session so it is visible immediately"""
+    db = SessionLocal()
+    try:
+        crud.update_upload_history(db, upload_id, features_processed=features_processed)
+    finally:
+        db.close()
+
+
+def _finish_job(upload_id: int, result: Dict[str, Any]) -> None:
+    """Record the final status and summary of a job"""
+    db = SessionLocal()
+    try:
+        crud.update_upload_history(
+            db,
+            upload_id,
+            status="success" if result.get("success") else "failed",
+            layer_id=result.get("layer_id"),
+            error_message=result.get("error"),
+            result=orjson.dumps(
+                result, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ).decode(),
+        )
+        logger.info(f"Upload job {upload_id} finished with status {result.get('success')}")
+    finally:
+        db.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
 from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
 from geoalchemy2.types import Geography
@@ -14,6 +14,9 @@ class SpatialLayer(Base):
     geometry_type = Column(String)
     srid = Column(Integer, default=4326)
     style = Column(String, nullable=True)
+    key_column = Column(String, nullable=True)  # Property the feature keys are derived from
+    # Bumped whenever the layer's features or style change; identifies cached copies
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -25,8 +28,28 @@ class Feature(Base):
     layer_id = Column(Integer, ForeignKey("spatial_layers.id"), index=True)
     geometry = Column(Geography("GEOMETRY", srid=4326))  # Using Geography type for lat/lon
     properties = Column(String)  # JSON string of properties
+    feature_key = Column(String, nullable=True)  # Value of the layer's key property, for upserts
+    feature_hash = Column(String(32), nullable=True)  # MD5 of geometry and properties
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_features_layer_key", "layer_id", "feature_key"),
+        Index("ix_features_layer_hash", "layer_id", "feature_hash"),
+        Index("ix_features_layer_id_id", "layer_id", "id"),  # Keyset pagination
+    )
+
+
+class FeatureSimplified(Base):
+    __tablename__ = "feature_simplified"
+
+    feature_id = Column(Integer, ForeignKey("features.id"), primary_key=True)
+    zoom = Column(Integer, primary_key=True)  # Zoom level the geometry is simplified for
+    layer_id = Column(Integer, ForeignKey("spatial_layers.id"))
+    # Only joined by feature, so no spatial index is needed
+    geometry = Column(Geography("GEOMETRY", srid=4326, spatial_index=False))
+
+    __table_args__ = (Index("ix_feature_simplified_layer_zoom", "layer_id", "zoom"),)
+
 
 class LayerAttribute(Base):
     __tablename__ = "layer_attributes"
@@ -47,4 +70,12 @@ class UploadHistory(Base):
     layer_id = Column(Integer, ForeignKey("spatial_layers.id"), index=True)
     status = Column(String)  # success, failed, processing
     error_message = Column(String, nullable=True)
+    features_processed = Column(Integer, default=0)
+    result = Column(String, nullable=True)  # JSON string of the processing summary
+    source_path = Column(String, nullable=True)  # Directory holding the staged upload files
+    options = Column(String, nullable=True)  # JSON string of staged files and processor options
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded files
+    checkpoint_batch = Column(Integer, default=0)  # Batches committed so far
+    checkpoint_rows = Column(Integer, default=0)  # Source rows consumed by committed batches
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,8 +1,20 @@
-from flask import Blueprint, jsonify, request, json
+import hashlib
+import itertools
+from datetime import datetime
+from typing import Optional, Tuple
+from flask import Blueprint, Response, jsonify, request, json, url_for
+from werkzeug.utils import secure_filename
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
+from config.tile_config import TILE_CONFIG, simplification_zoom, tile_feature_limit
+from app.cache import layer_cache
+from app.compression import compress, decompress, iter_compressed, negotiate
+from config.compression_config import COMPRESSION_CONFIG
 from app.database.base import get_db
 from app.database import crud
+from app.database.export import iter_layer_export
+from app.database.utils import iter_geojson_feature_collection
+from tools.io.writers import EXPORT_FORMATS
 
 logger = setup_logger(
     "api_routes",
@@ -12,14 +24,76 @@ logger = setup_logger(
 
 bp = Blueprint("api", __name__)
 
+# Default and largest page sizes of the paginated feature endpoint
+FEATURE_PAGE_LIMIT = 1000
+FEATURE_PAGE_MAX_LIMIT = 10000
+
+# Response types compressed according to Accept-Encoding
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/vnd.mapbox-vector-tile"}
+
+
+@bp.after_request
+def compress_response(response):
+    """
+    Compress responses with the best coding the client accepts
+
+    Streamed responses are compressed on the fly as they are written;
+    others once they are complete and at least the configured min_size.
+    Responses that already have a Content-Encoding, such as precompressed
+    cached layers, are left as they are.
+    """
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES and response.status_code != 304:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    if (
+        response.status_code != 200
+        or response.content_encoding
+        or response.direct_passthrough
+        or request.cache_control.no_transform
+    ):
+        return response
+    encoding = negotiate(request.accept_encodings)
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        body = response.response
+        response.response = iter_compressed(response.iter_encoded(), encoding)
+        if hasattr(body, "close"):
+            # Closes the original stream (and the session behind it) with the response
+            response.call_on_close(body.close)
+    else:
+        if (response.content_length or 0) < COMPRESSION_CONFIG["min_size"]:
+            return response
+        response.set_data(compress(response.get_data(), encoding))
+    response.content_encoding = encoding
+    return response
+
 
 @bp.route("/layers")
 def get_layers():
-    """Get all available layers with their styles"""
+    """
+    Get all available layers with their styles
+
+    The ETag changes whenever a layer is added, changed or deleted, and a
+    matching If-None-Match is answered with 304 Not Modified.
+    """
     try:
         db = next(get_db())
         layers = crud.get_all_layers(db)
-        return jsonify(
+
+        # No Last-Modified: deleting the newest layer would move it backwards
+        # The creation time tells apart layers given the same ID after a database reset
+        versions = ",".join(
+            f"{layer.id}:{layer.created_at.timestamp():.0f}:{layer.version}" for layer in layers
+        )
+        etag = "layers-" + hashlib.md5(versions.encode()).hexdigest()
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        response = jsonify(
             [
                 {
                     "id": layer.id,
@@ -27,11 +101,13 @@ def get_layers():
                     "description": layer.description,
                     "geometry_type": layer.geometry_type,
                     "style": json.loads(layer.style) if layer.style else None,
+                    "version": layer.version,
                     "created_at": layer.created_at.isoformat(),
                 }
                 for layer in layers
             ]
         )
+        return _with_validators(response, etag)
     except Exception as e:
         logger.error(f"Error fetching layers: {e}")
         return jsonify({"error": "Failed to fetch layers"}), 500
@@ -39,27 +115,223 @@ def get_layers():
 
 @bp.route("/layers/<int:layer_id>")
 def get_layer_data(layer_id):
-    """Get GeoJSON data for a specific layer"""
+    """
+    Get GeoJSON data for a specific layer
+
+    Optional query parameters restrict the features returned:
+    bbox=minx,miny,maxx,maxy (longitude/latitude) keeps those intersecting
+    the box, and limit caps their number. The collection's "truncated"
+    member tells whether more features matched than were returned. zoom,
+    the map zoom level, serves lines and polygons simplified for display
+    at that level.
+
+    The response is streamed from a server-side cursor, so memory use does
+    not grow with the number of features. Whole-layer responses (without
+    bbox or limit) are also kept precompressed in the layer cache for later
+    requests of the same layer version and simplification level. Its ETag
+    and Last-Modified follow the layer's version, and matching If-None-Match
+    or If-Modified-Since headers are answered with 304 Not Modified without
+    reading any features.
+
+    format=fgb, parquet or arrow downloads the whole layer as FlatGeobuf
+    (with its spatial index), GeoParquet or an Arrow IPC stream instead.
+    """
+    fmt = request.args.get("format", "geojson")
+    if fmt != "geojson":
+        if fmt not in EXPORT_FORMATS:
+            formats = ", ".join(["geojson", *EXPORT_FORMATS])
+            return jsonify({"error": f"format must be one of {formats}"}), 400
+        if any(name in request.args for name in ("bbox", "limit", "zoom")):
+            return jsonify({"error": "bbox, limit and zoom only apply to GeoJSON"}), 400
+
     try:
-        db = next(get_db())
-        features = crud.get_layer_features(db, layer_id)
+        bbox = _parse_bbox(request.args.get("bbox"))
+        limit = _optional_int(request.args.get("limit"), "limit")
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be a positive integer")
+        zoom = _optional_int(request.args.get("zoom"), "zoom")
+        if zoom is not None and zoom < 0:
+            raise ValueError("zoom must not be negative")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        if not features:
-            return jsonify({"error": "No features found"}), 404
+    sessions = get_db()
+    try:
+        db = next(sessions)
+        layer = crud.get_layer_by_id(db, layer_id)
+        if not layer:
+            sessions.close()
+            return jsonify({"error": "Layer not found"}), 404
 
-        try:
-            from app.database.utils import features_to_geojson
+        etag, last_modified = _layer_validators(layer)
+        not_modified = _not_modified(etag, last_modified)
+        if not_modified:
+            sessions.close()
+            return not_modified
 
-            geojson = features_to_geojson(features)
-            return jsonify(geojson)
-        except Exception as e:
-            logger.error(f"Error converting features to GeoJSON: {e}")
-            return jsonify({"error": "Error processing feature data"}), 500
+        if fmt != "geojson":
+            response = _export_response(sessions, db, layer, fmt)
+            return _with_validators(response, etag, last_modified)
+
+        # Only whole-layer payloads are cached, one per simplification level;
+        # bbox and limit would fill the cache with one-off variants
+        simplify_zoom = simplification_zoom(zoom) if zoom is not None else None
+        cache_variant = None
+        if bbox is None and limit is None:
+            cache_variant = f"zoom-{simplify_zoom}" if simplify_zoom is not None else ""
+
+        cached = None
+        if cache_variant is not None:
+            cached = layer_cache.get(layer.id, layer.created_at, layer.version, cache_variant)
+        if cached is not None:
+            sessions.close()
+            encoding = negotiate(request.accept_encodings, available=cached)
+            if encoding:
+                response = Response(cached[encoding], mimetype="application/json")
+                response.content_encoding = encoding
+            else:
+                body = decompress(cached["gzip"], "gzip")
+                response = Response(body, mimetype="application/json")
+            return _with_validators(response, etag, last_modified)
 
+        # One extra feature tells whether the result was truncated
+        features = crud.iter_layer_features_geojson(
+            db,
+            layer_id,
+            bbox=bbox,
+            limit=limit + 1 if limit else None,
+            simplify_zoom=simplify_zoom,
+        )
+        first = next(features, None)
     except Exception as e:
+        sessions.close()
         logger.error(f"Error fetching layer {layer_id}: {e}")
         return jsonify({"error": f"Failed to fetch layer {layer_id}"}), 500
 
+    if first is None and bbox is None:
+        sessions.close()
+        return jsonify({"error": "No features found"}), 404
+
+    def generate():
+        # Features arrive as GeoJSON text from PostGIS and are written out as
+        # they are fetched; the session stays open until the last one
+        cache_writer = None
+        if cache_variant is not None:
+            cache_writer = layer_cache.writer(
+                layer.id, layer.created_at, layer.version, cache_variant
+            )
+        try:
+            features_fetched = itertools.chain([first] if first is not None else [], features)
+            for chunk in iter_geojson_feature_collection(features_fetched, limit):
+                if cache_writer:
+                    cache_writer.write(chunk)
+                yield chunk
+            if cache_writer:
+                cache_writer.close()
+        except Exception as e:
+            logger.error(f"Error streaming layer {layer_id}: {e}")
+            raise
+        finally:
+            sessions.close()
+
+    response = Response(generate(), mimetype="application/json")
+    return _with_validators(response, etag, last_modified)
+
+
+@bp.route("/layers/<int:layer_id>/features")
+def get_layer_features_page(layer_id):
+    """
+    Page through a layer's features in ID order
+
+    Query parameters: after, the next_cursor of the previous page (omit for
+    the first page), and limit, the page size. The FeatureCollection's
+    next_cursor and next members lead to the following page and are null
+    on the last one.
+    """
+    try:
+        after = _optional_int(request.args.get("after"), "after")
+        limit = _optional_int(request.args.get("limit"), "limit")
+        if limit is None:
+            limit = FEATURE_PAGE_LIMIT
+        if limit < 1 or limit > FEATURE_PAGE_MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {FEATURE_PAGE_MAX_LIMIT}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        db = next(get_db())
+        if not crud.get_layer_by_id(db, layer_id):
+            return jsonify({"error": "Layer not found"}), 404
+
+        # One extra feature tells whether another page follows
+        rows = crud.get_layer_features_page(db, layer_id, after=after, limit=limit + 1)
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        geojson = "".join(
+            iter_geojson_feature_collection(
+                (feature for _, feature in rows),
+                limit=limit,
+                members={
+                    "next_cursor": next_cursor,
+                    "next": (
+                        url_for(
+                            "api.get_layer_features_page",
+                            layer_id=layer_id,
+                            after=next_cursor,
+                            limit=limit,
+                        )
+                        if next_cursor is not None
+                        else None
+                    ),
+                },
+            )
+        )
+        return Response(geojson, mimetype="application/json")
+    except Exception as e:
+        logger.error(f"Error fetching features of layer {layer_id}: {e}")
+        return jsonify({"error": f"Failed to fetch features of layer {layer_id}"}), 500
+
+
+@bp.route("/layers/<int:layer_id>/tiles/<int:z>/<int:x>/<int:y>.mvt")
+def get_layer_tile(layer_id, z, x, y):
+    """
+    Get a Mapbox Vector Tile of a layer's features
+
+    Tiles are built in PostGIS and hold at most the configured number of
+    features for their zoom level, with lines and polygons simplified to
+    the tile's resolution. The attributes query parameter selects
+    the properties included, e.g. ?attributes=name,type (empty for none).
+    """
+    if z > TILE_CONFIG["max_zoom"] or not (0 <= x < 2**z and 0 <= y < 2**z):
+        return jsonify({"error": f"Invalid tile {z}/{x}/{y}"}), 400
+
+    attributes = request.args.get("attributes")
+    if attributes is not None:
+        attributes = [name.strip() for name in attributes.split(",") if name.strip()]
+
+    try:
+        db = next(get_db())
+        if not crud.get_layer_by_id(db, layer_id):
+            return jsonify({"error": "Layer not found"}), 404
+
+        tile = crud.get_layer_tile(
+            db,
+            layer_id,
+            z,
+            x,
+            y,
+            limit=tile_feature_limit(z),
+            attributes=attributes,
+            extent=TILE_CONFIG["extent"],
+            buffer=TILE_CONFIG["buffer"],
+            simplify_zoom=simplification_zoom(z),
+        )
+        if not tile:
+            return Response(status=204)
+        return Response(tile, mimetype="application/vnd.mapbox-vector-tile")
+    except Exception as e:
+        logger.error(f"Error building tile {z}/{x}/{y} of layer {layer_id}: {e}")
+        return jsonify({"error": f"Failed to build tile {z}/{x}/{y}"}), 500
+
 
 @bp.route("/layers/<int:layer_id>/style", methods=["PUT"])
 def update_layer_style(layer_id):
@@ -84,3 +356,98 @@ def delete_layer(layer_id):
     except Exception as e:
         logger.error(f"Error deleting layer: {e}")
         return jsonify({"error": "Failed to delete layer"}), 500
+
+
+def _export_response(sessions, db, layer, fmt: str) -> Response:
+    """Stream a layer in a binary export format, closing the session once done"""
+    try:
+        # Starting the export here reports failures before the response is sent
+        chunks = iter_layer_export(db, layer, fmt)
+        first = next(chunks, b"")
+    except Exception as e:
+        sessions.close()
+        logger.error(f"Error exporting layer {layer.id} as {fmt}: {e}")
+        return jsonify({"error": f"Failed to export layer {layer.id}"}), 500
+
+    def generate():
+        try:
+            yield first
+            yield from chunks
+        except Exception as e:
+            logger.error(f"Error exporting layer {layer.id} as {fmt}: {e}")
+            raise
+        finally:
+            sessions.close()
+
+    filename = secure_filename(layer.name) or f"layer_{layer.id}"
+    response = Response(generate(), mimetype=EXPORT_FORMATS[fmt]["mimetype"])
+    response.headers.set(
+        "Content-Disposition",
+        "attachment",
+        filename=filename + EXPORT_FORMATS[fmt]["extension"],
+    )
+    return response
+
+
+def _layer_validators(layer) -> Tuple[str, datetime]:
+    """Get the ETag and Last-Modified of a layer's data as requested"""
+    # bbox, limit and zoom select different representations of the same version
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    # The creation time tells apart layers given the same ID after a database reset
+    etag = f"layer-{layer.id}-{layer.created_at.timestamp():.0f}-{layer.version}"
+    if query:
+        etag += "-" + hashlib.md5(query.encode()).hexdigest()[:12]
+    return etag, layer.updated_at or layer.created_at
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Get a 304 response if the request's conditional headers match, otherwise None"""
+    # If-Modified-Since only applies when no If-None-Match is sent (RFC 9110)
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        # HTTP dates have whole-second precision
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    return _with_validators(Response(status=304), etag, last_modified)
+
+
+def _with_validators(
+    response: Response, etag: str, last_modified: Optional[datetime] = None
+) -> Response:
+    """Set the validators of a response and have caches revalidate it before reuse"""
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def _parse_bbox(value: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse a minx,miny,maxx,maxy query parameter, clamped to longitude/latitude bounds"""
+    if value is None:
+        return None
+
+    try:
+        minx, miny, maxx, maxy = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be minx,miny,maxx,maxy")
+    if not (minx < maxx and miny < maxy):
+        raise ValueError("bbox minimums must be less than its maximums")
+
+    # Map viewports can extend past the antimeridian and the poles
+    return (max(minx, -180.0), max(miny, -90.0), min(maxx, 180.0), min(maxy, 90.0))
+
+
+def _optional_int(value: Optional[str], name: str) -> Optional[int]:
+    """Parse an optional integer query parameter"""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
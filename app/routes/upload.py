@@ -1,8 +1,9 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, request, jsonify, render_template, url_for
 import os
+from typing import Any, Dict
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
-from app.database.base import get_db
+from app.jobs import submit_upload_job, get_job_status
 from processors.factory import DataProcessorFactory
 from pathlib import Path
 
@@ -38,22 +39,19 @@ def upload_shapefile():
         # Get the shapefile processor
         processor = DataProcessorFactory.get_processor("shapefile")
 
-        # Validate files
-        if not processor.validate_files(request.files):
+        # Validate files; either a zip archive or the separate components
+        if not processor.validate_files(_uploaded_files()):
             return render_template("upload_error.html", error_message="Missing required files")
 
-        # Process the files
-        result = processor.process_data(
-            files=request.files,
-            layer_name=layer_name if not use_ai_name else None,
-            db_session=next(get_db()),
-            description=request.form.get("description", ""),
+        # Queue the files for background processing
+        return _queue_upload(
+            "shapefile",
+            {
+                "layer_name": layer_name if not use_ai_name else None,
+                "description": request.form.get("description", ""),
+            },
         )
 
-        if result["success"]:
-            return render_template("upload_success.html", result=result)
-        return render_template("upload_error.html", error_message=result["error"])
-
     except Exception as e:
         logger.error(f"Error in upload process: {e}", exc_info=True)
         return render_template("upload_error.html", error_message=str(e))
@@ -76,19 +74,16 @@ def upload_csv():
         if not processor.validate_files(request.files):
             return render_template("upload_error.html", error_message="Missing CSV file")
 
-        result = processor.process_data(
-            files=request.files,
-            layer_name=layer_name if not use_ai_name else None,
-            db_session=next(get_db()),
-            description=request.form.get("description", ""),
-            lat_column=request.form.get("lat_column"),
-            lon_column=request.form.get("lon_column"),
+        return _queue_upload(
+            "csv",
+            {
+                "layer_name": layer_name if not use_ai_name else None,
+                "description": request.form.get("description", ""),
+                "lat_column": request.form.get("lat_column"),
+                "lon_column": request.form.get("lon_column"),
+            },
         )
 
-        if result["success"]:
-            return render_template("upload_success.html", result=result)
-        return render_template("upload_error.html", error_message=result["error"])
-
     except Exception as e:
         logger.error(f"Error in CSV upload process: {e}", exc_info=True)
         return render_template("upload_error.html", error_message=str(e))
@@ -111,17 +106,14 @@ def upload_geojson():
         if not processor.validate_files(request.files):
             return render_template("upload_error.html", error_message="Missing GeoJSON file")
 
-        result = processor.process_data(
-            files=request.files,
-            layer_name=layer_name if not use_ai_name else None,
-            db_session=next(get_db()),
-            description=request.form.get("description", ""),
+        return _queue_upload(
+            "geojson",
+            {
+                "layer_name": layer_name if not use_ai_name else None,
+                "description": request.form.get("description", ""),
+            },
         )
 
-        if result["success"]:
-            return render_template("upload_success.html", result=result)
-        return render_template("upload_error.html", error_message=result["error"])
-
     except Exception as e:
         logger.error(f"Error in GeoJSON upload process: {e}", exc_info=True)
         return render_template("upload_error.html", error_message=str(e))
@@ -149,27 +141,59 @@ def upload_geopackage():
         # Get selected layer if not processing all layers
         selected_layer = None if process_all_layers else request.form.get("selected_layer")
 
-        result = processor.process_data(
-            files=request.files,
-            layer_name=layer_name if not use_ai_name else None,
-            db_session=next(get_db()),
-            description=request.form.get("description", ""),
-            selected_layer=selected_layer,
+        return _queue_upload(
+            "geopackage",
+            {
+                "layer_name": layer_name if not use_ai_name else None,
+                "description": request.form.get("description", ""),
+                "selected_layer": selected_layer,
+                "max_workers": request.form.get("max_workers", type=int),
+            },
         )
 
-        if result["success"]:
-            return render_template("upload_success.html", result=result)
-
-        # If multiple layers were found and none selected (only when not processing all)
-        if not result["success"] and "available_layers" in result and not process_all_layers:
-            return render_template(
-                "upload_error.html",
-                error_message="Please select a layer from the GeoPackage",
-                available_layers=result["available_layers"],
-            )
-
-        return render_template("upload_error.html", error_message=result["error"])
-
     except Exception as e:
         logger.error(f"Error in GeoPackage upload process: {e}", exc_info=True)
         return render_template("upload_error.html", error_message=str(e))
+
+
+@bp.route("/jobs/<int:upload_id>", methods=["GET"])
+def get_upload_job(upload_id):
+    """Report the status and progress of a queued upload"""
+    try:
+        status = get_job_status(upload_id)
+        if status is None:
+            return jsonify({"error": "Upload job not found"}), 404
+        return jsonify(status)
+    except Exception as e:
+        logger.error(f"Error fetching upload job {upload_id}: {e}")
+        return jsonify({"error": f"Failed to fetch upload job {upload_id}"}), 500
+
+
+def _queue_upload(file_type: str, options: Dict[str, Any]):
+    """Stage the request's files, queue a processing job and report where to poll it"""
+    write_mode = request.form.get("write_mode") or "insert"
+    if write_mode != "insert":
+        if not options.get("layer_name"):
+            raise ValueError(f"An existing layer name is required to {write_mode}")
+        if write_mode == "upsert" and not request.form.get("key_column"):
+            raise ValueError("A key column is required to upsert")
+        options = {
+            **options,
+            "write_mode": write_mode,
+            "key_column": request.form.get("key_column") if write_mode == "upsert" else None,
+        }
+
+    files = _uploaded_files()
+    upload_id = submit_upload_job(
+        file_type, files, options, on_duplicate=request.form.get("on_duplicate")
+    )
+    status_url = url_for("upload.get_upload_job", upload_id=upload_id)
+
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": upload_id, "status": "processing", "status_url": status_url}), 202
+    return render_template("upload_queued.html", job_id=upload_id, status_url=status_url)
+
+
+def _uploaded_files() -> Dict[str, Any]:
+    """Get the request's files, leaving out file inputs submitted without a file"""
+    return {key: file for key, file in request.files.items() if file.filename}
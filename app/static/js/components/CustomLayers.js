@@ -261,14 +261,10 @@ export class CustomLayers {
     }
 
     downloadLayer(layerId, layerName) {
-        if (!this.layers.has(layerId)) return;
-        
-        const geojson = this.layers.get(layerId).toGeoJSON();
-        const dataStr = "data:text/json;charset=utf-8," + 
-            encodeURIComponent(JSON.stringify(geojson));
-        
+        // The layer endpoint streams its response, so the browser can save it
+        // directly without the layer being loaded on the map
         const downloadLink = document.createElement('a');
-        downloadLink.href = dataStr;
+        downloadLink.href = `/api/layers/${layerId}`;
         downloadLink.download = `${layerName}.geojson`;
         document.body.appendChild(downloadLink);
         downloadLink.click();
@@ -227,19 +227,14 @@ function updateLayerStyle(layerId) {
 }
 
 function downloadLayer(layerId, layerName) {
-    fetch(`/api/layers/${layerId}`)
-        .then(response => response.json())
-        .then(data => {
-            // Create downloadable file
-            const dataStr = "data:text/json;charset=utf-8," +
-                           encodeURIComponent(JSON.stringify(data));
-            const downloadAnchorNode = document.createElement('a');
-            downloadAnchorNode.setAttribute("href", dataStr);
-            downloadAnchorNode.setAttribute("download", `${layerName}.geojson`);
-            document.body.appendChild(downloadAnchorNode);
-            downloadAnchorNode.click();
-            downloadAnchorNode.remove();
-        });
+    // Link straight to the streamed endpoint so the browser writes the
+    // response to disk as it arrives instead of holding it in memory
+    const downloadAnchorNode = document.createElement('a');
+    downloadAnchorNode.setAttribute("href", `/api/layers/${layerId}`);
+    downloadAnchorNode.setAttribute("download", `${layerName}.geojson`);
+    document.body.appendChild(downloadAnchorNode);
+    downloadAnchorNode.click();
+    downloadAnchorNode.remove();
 }
 
 function deleteLayer(layerId) {
@@ -0,0 +1,84 @@
+"""
+Benchmark convert_to_2d on polygon layers with Z coordinates
+
+Compares the vectorized implementation against the previous approach of
+rebuilding each geometry coordinate by coordinate in Python.
+
+Usage:
+    python -m benchmarks.convert_to_2d [--features N] [--vertices N] [--repeat N]
+"""
+
+import argparse
+import time
+import numpy as np
+import geopandas as gpd
+import shapely
+from shapely.geometry import Polygon
+from tools.conversion.geometry_converter import convert_to_2d
+
+
+def make_polygons(features: int, vertices: int, seed: int = 0) -> gpd.GeoSeries:
+    """Build a layer of 3D ring-shaped polygons with the given number of vertices each"""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radii = 1 + 0.2 * rng.random((features, vertices))
+
+    coords = np.empty((features, vertices + 1, 3))
+    coords[:, :-1, 0] = radii * np.cos(angles) + rng.random((features, 1)) * 100
+    coords[:, :-1, 1] = radii * np.sin(angles) + rng.random((features, 1)) * 100
+    coords[:, :-1, 2] = rng.random((features, vertices)) * 50
+    coords[:, -1] = coords[:, 0]
+
+    return gpd.GeoSeries(shapely.polygons(coords), crs="EPSG:4326")
+
+
+def legacy_convert_to_2d(geometries: gpd.GeoSeries) -> gpd.GeoSeries:
+    """The previous per-geometry implementation (polygons only)"""
+
+    def convert(geom):
+        exterior = [(p[0], p[1]) for p in geom.exterior.coords]
+        interiors = [[(p[0], p[1]) for p in interior.coords] for interior in geom.interiors]
+        return Polygon(exterior, interiors)
+
+    return geometries.apply(convert)
+
+
+def time_call(func, geometries: gpd.GeoSeries, repeat: int) -> float:
+    """Return the best wall time of repeat calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(geometries)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--features", type=int, default=1000, help="Polygons per layer")
+    parser.add_argument("--vertices", type=int, default=1000, help="Vertices per polygon")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    geometries = make_polygons(args.features, args.vertices)
+    total_vertices = int(shapely.get_num_coordinates(geometries.values.to_numpy()).sum())
+    flat = convert_to_2d(geometries)
+    mixed = gpd.GeoSeries(
+        np.where(np.arange(len(geometries)) % 2 == 0, flat.values, geometries.values),
+        crs=geometries.crs,
+    )
+
+    print(f"{args.features:,} polygons, {total_vertices:,} vertices")
+    cases = [
+        ("legacy, all 3D", legacy_convert_to_2d, geometries),
+        ("vectorized, all 3D", convert_to_2d, geometries),
+        ("vectorized, half 2D", convert_to_2d, mixed),
+        ("vectorized, all 2D", convert_to_2d, flat),
+    ]
+    for label, func, data in cases:
+        seconds = time_call(func, data, args.repeat)
+        print(f"{label:<22} {seconds:8.3f}s  {total_vertices / seconds / 1e6:10.1f}M vertices/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+Benchmark ingestion throughput of every upload processor against PostGIS
+
+Synthetic points, routes and polygons are produced with
+GeospatialDataGenerator inside a fixed offline boundary (routes run over a
+synthetic street grid), written in every supported upload format, and run
+through the matching DataProcessorFactory processor against the database
+configured in .env. Each case runs in a fresh process and reports
+features/sec, time per ingest stage and peak RSS. Results are written as
+JSON so runs can be compared across commits.
+
+The generator builds features one at a time, so it produces a seed sample
+of at most --seed-features per data type; larger layers repeat the seed
+with small random offsets. Generated files are kept in --data-dir and
+reused by later runs, so every commit is measured on identical input.
+
+Usage:
+    python -m benchmarks.ingest [--sizes 10000,100000] [--types points,routes]
+        [--formats geojson,csv] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import math
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import wraps
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import geopandas as gpd
+import numpy as np
+import orjson
+import pandas as pd
+import shapely
+from shapely.geometry import box
+
+SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+DATA_TYPES = ("points", "routes", "polygons")
+# Upload format -> (processor, data types it can hold)
+FORMATS = {
+    "geojson": ("geojson", DATA_TYPES),
+    "shapefile": ("shapefile", DATA_TYPES),
+    "shapefile_zip": ("shapefile", DATA_TYPES),
+    "geopackage": ("geopackage", DATA_TYPES),
+    "csv": ("csv", ("points",)),
+}
+# Same fallback area the generator uses for unknown regions (Seattle)
+BOUNDARY = box(-122.4359, 47.5003, -122.2359, 47.7340)
+# Offset applied to each repeat of the seed sample, in degrees
+TILE_JITTER = 0.0005
+
+
+def street_grid(boundary, nodes_per_side: int = 40):
+    """Build a street grid covering the boundary, in the graph format osmnx produces"""
+    import networkx as nx
+
+    minx, miny, maxx, maxy = boundary.bounds
+    xs = np.linspace(minx, maxx, nodes_per_side)
+    ys = np.linspace(miny, maxy, nodes_per_side)
+    dx = (xs[1] - xs[0]) * 111_320 * math.cos(math.radians((miny + maxy) / 2))
+    dy = (ys[1] - ys[0]) * 110_540
+
+    graph = nx.MultiDiGraph(crs="EPSG:4326")
+    for i, x in enumerate(xs):
+        for j, y in enumerate(ys):
+            graph.add_node(i * nodes_per_side + j, x=x, y=y)
+
+    for i in range(nodes_per_side):
+        for j in range(nodes_per_side):
+            node = i * nodes_per_side + j
+            if i + 1 < nodes_per_side:
+                graph.add_edge(node, node + nodes_per_side, key=0, length=dx)
+                graph.add_edge(node + nodes_per_side, node, key=0, length=dx)
+            if j + 1 < nodes_per_side:
+                graph.add_edge(node, node + 1, key=0, length=dy)
+                graph.add_edge(node + 1, node, key=0, length=dy)
+    return graph
+
+
+def generate_layer(data_type: str, features: int, seed_features: int, seed: int = 0):
+    """Generate a layer of the given size, repeating a generated seed sample as needed"""
+    from tools.generator.generator import GeospatialDataGenerator
+
+    np.random.seed(seed)
+    boundary = gpd.GeoDataFrame(geometry=[BOUNDARY], crs="EPSG:4326")
+    generator = GeospatialDataGenerator(
+        data_type=data_type,
+        region="benchmark",
+        num_points=min(features, seed_features),
+        boundary=boundary,
+        graph=street_grid(BOUNDARY) if data_type == "routes" else None,
+    )
+    if not generator.generate_data():
+        raise RuntimeError(f"Failed to generate {data_type}")
+
+    sample = generator.data.reset_index(drop=True)
+    if sample.crs is None:
+        sample = sample.set_crs("EPSG:4326")
+    return tile_layer(sample, features, np.random.default_rng(seed))
+
+
+def tile_layer(sample: gpd.GeoDataFrame, features: int, rng: np.random.Generator):
+    """Repeat a sample until it has the given number of features, offsetting each repeat"""
+    positions = np.resize(np.arange(len(sample)), features)
+    layer = sample.iloc[positions].reset_index(drop=True)
+
+    repeat = np.arange(features) // len(sample)
+    if repeat[-1] > 0:
+        offsets = rng.uniform(-TILE_JITTER, TILE_JITTER, (repeat[-1] + 1, 2))
+        offsets[0] = 0
+        geometries = np.array(layer.geometry.values.to_numpy(), dtype=object, copy=True)
+        coords, index = shapely.get_coordinates(geometries, return_index=True)
+        geometries = shapely.set_coordinates(geometries, coords + offsets[repeat[index]])
+        layer = layer.set_geometry(gpd.GeoSeries(geometries, crs=sample.crs))
+
+    # Keep generated ID columns unique
+    for column in ("point_id", "route_id", "zone_id"):
+        if column in layer.columns:
+            layer[column] = np.arange(features)
+    return layer
+
+
+def write_layer(layer: gpd.GeoDataFrame, fmt: str, path: Path) -> Dict[str, Path]:
+    """Write a layer in an upload format, returning the files keyed by form field"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "geojson":
+        layer.to_file(path.with_suffix(".geojson"), driver="GeoJSON", engine="pyogrio")
+        return {"file_geojson": path.with_suffix(".geojson")}
+    if fmt == "geopackage":
+        layer.to_file(path.with_suffix(".gpkg"), driver="GPKG", layer=path.stem, engine="pyogrio")
+        return {"file_gpkg": path.with_suffix(".gpkg")}
+    if fmt == "shapefile":
+        layer.to_file(path.with_suffix(".shp"), engine="pyogrio")
+        return {f"file_{ext}": path.with_suffix(f".{ext}") for ext in ("shp", "shx", "dbf", "prj")}
+    if fmt == "shapefile_zip":
+        layer.to_file(path.with_suffix(".shp.zip"), driver="ESRI Shapefile", engine="pyogrio")
+        return {"file_zip": path.with_suffix(".shp.zip")}
+    if fmt == "csv":
+        table = pd.DataFrame(layer.drop(columns=layer.geometry.name))
+        table["latitude"] = layer.geometry.y
+        table["longitude"] = layer.geometry.x
+        table.to_csv(path.with_suffix(".csv"), index=False)
+        return {"file_csv": path.with_suffix(".csv")}
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def prepare_files(
+    data_type: str, features: int, formats: List[str], data_dir: Path, seed_features: int
+) -> Dict[str, Dict[str, Path]]:
+    """
+    Write a benchmark layer in each format, reusing files from earlier runs
+
+    Returns:
+        Mapping of format to the files of that format keyed by form field
+    """
+    case_dir = data_dir / f"{data_type}_{features}_s{seed_features}"
+    prepared = {}
+    layer = None
+    for fmt in formats:
+        manifest = case_dir / f"{fmt}.json"
+        if manifest.exists():
+            files = {key: Path(path) for key, path in orjson.loads(manifest.read_bytes()).items()}
+            if all(path.exists() for path in files.values()):
+                prepared[fmt] = files
+                continue
+
+        if layer is None:
+            print(f"Generating {features:,} {data_type}", file=sys.stderr)
+            layer = generate_layer(data_type, features, seed_features)
+        files = write_layer(layer, fmt, case_dir / f"{data_type}_{fmt}")
+        manifest.write_bytes(orjson.dumps({key: str(path) for key, path in files.items()}))
+        prepared[fmt] = files
+    return prepared
+
+
+class StageTimer:
+    """
+    Attribute wall time to ingest stages by wrapping the functions that run them
+
+    Time is exclusive: while a nested stage runs (e.g. a streaming reader
+    pulled by the database writer), the outer stage's clock is paused, so
+    the stage totals add up to the overall run time.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self._stack: List[str] = ["other"]
+        self._mark = time.perf_counter()
+        self._patches = []
+
+    def start(self) -> None:
+        self.totals.clear()
+        self._mark = time.perf_counter()
+
+    def enter(self, stage: str) -> None:
+        self._charge()
+        self._stack.append(stage)
+
+    def exit(self) -> None:
+        self._charge()
+        self._stack.pop()
+
+    def finish(self) -> Dict[str, float]:
+        self._charge()
+        return {stage: round(seconds, 4) for stage, seconds in sorted(self.totals.items())}
+
+    def _charge(self) -> None:
+        """Add the time since the last switch to the running stage"""
+        now = time.perf_counter()
+        stage = self._stack[-1]
+        self.totals[stage] = self.totals.get(stage, 0.0) + now - self._mark
+        self._mark = now
+
+    def timed(self, stage: str, func: Callable) -> Callable:
+        """Wrap a function so its calls (and any iterator it returns) count toward stage"""
+        timer = self
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timer.enter(stage)
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                timer.exit()
+            if hasattr(result, "__next__"):
+                return _TimedIterator(timer, stage, result)
+            return result
+
+        return wrapper
+
+    def patch(self, stage: str, owner: Any, name: str) -> None:
+        """Time calls to owner.name as stage until restore is called"""
+        original = getattr(owner, name)
+        self._patches.append((owner, name, original))
+        setattr(owner, name, self.timed(stage, original))
+
+    def restore(self) -> None:
+        for owner, name, original in reversed(self._patches):
+            setattr(owner, name, original)
+        self._patches.clear()
+
+
+class _TimedIterator:
+    """Iterator proxy charging each step to a stage, forwarding everything else"""
+
+    def __init__(self, timer: StageTimer, stage: str, iterator):
+        self._timer = timer
+        self._stage = stage
+        self._iterator = iterator
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._timer.enter(self._stage)
+        try:
+            return next(self._iterator)
+        finally:
+            self._timer.exit()
+
+    def __getattr__(self, name):
+        return getattr(self._iterator, name)
+
+
+def instrument(timer: StageTimer) -> None:
+    """Patch the functions behind each ingest stage"""
+    import processors.csv_processor
+    import processors.geojson_processor
+    import processors.geopackage_processor
+    import processors.shapefile_processor
+    from app.database import crud
+    from tools.ai.smart_processor import SmartProcessor
+
+    timer.patch("read", pd, "read_csv")
+    for module in (
+        processors.geojson_processor,
+        processors.geopackage_processor,
+        processors.shapefile_processor,
+    ):
+        timer.patch("read", module, "read_vector")
+        for name, stage in (
+            ("iter_geojson_batches", "read"),
+            ("standardize_crs", "crs"),
+            ("validate_and_fix_geometries", "validate"),
+        ):
+            if hasattr(module, name):
+                timer.patch(stage, module, name)
+    timer.patch("analyze", SmartProcessor, "analyze_dataset")
+    timer.patch("write", crud, "add_features_bulk")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its finished children"""
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Ingest one benchmark file in the current (fresh) process"""
+    from app.database import crud
+    from app.database.base import SessionLocal
+    from app.jobs import _result_layer_ids
+    from config.ingest_config import INGEST_CONFIG
+    from processors.factory import DataProcessorFactory
+    from tools.io.uploads import InMemoryFile, StagedFile
+
+    baseline_rss = peak_rss_mb()
+    timer = StageTimer()
+    instrument(timer)
+    processor = DataProcessorFactory.get_processor(case["processor"])
+    options = {"max_workers": case["gpkg_workers"]} if case["processor"] == "geopackage" else {}
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        timer.start()
+
+        # Stage the files the way background jobs do: in memory when small enough
+        paths = {key: Path(path) for key, path in case["files"].items()}
+        total_bytes = sum(path.stat().st_size for path in paths.values())
+        timer.enter("stage")
+        if total_bytes <= INGEST_CONFIG["in_memory_threshold"]:
+            files = {key: InMemoryFile(path.name, path.read_bytes()) for key, path in paths.items()}
+        else:
+            files = {key: StagedFile(path) for key, path in paths.items()}
+        timer.exit()
+
+        result = processor.process_data(
+            files=files, layer_name=case["layer_name"], db_session=db, **options
+        )
+        seconds = time.perf_counter() - start
+        stages = timer.finish()
+    finally:
+        timer.restore()
+
+    try:
+        for layer_id in _result_layer_ids(result):
+            if not case["keep_layers"]:
+                crud.delete_layer(db, layer_id)
+    finally:
+        db.close()
+
+    written = result.get("feature_count")
+    if "processed_layers" in result:
+        written = sum(layer.get("feature_count", 0) for layer in result["processed_layers"])
+    return {
+        "success": bool(result.get("success")),
+        "error": result.get("error"),
+        "features_written": written,
+        "seconds": round(seconds, 3),
+        "features_per_second": round((written or 0) / seconds, 1),
+        "stages": stages,
+        "file_bytes": total_bytes,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_revision() -> Dict[str, Any]:
+    """Identify the commit being measured"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    return f"{result['data_type']}/{result['features']}/{result['format']}"
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: Path, threshold: float) -> bool:
+    """Print throughput changes against a baseline run; False if any case regressed"""
+    baseline = {case_key(r): r for r in orjson.loads(baseline_path.read_bytes())["results"]}
+    ok = True
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(case_key(result))
+        if not before or not before["features_per_second"] or not result["success"]:
+            continue
+        change = result["features_per_second"] / before["features_per_second"] - 1
+        regressed = change < -threshold
+        ok = ok and not regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{case_key(result):<36} {change:+8.1%}{flag}")
+    return ok
+
+
+def parse_list(value: str, choices, cast=str) -> list:
+    items = [cast(item.strip()) for item in value.split(",") if item.strip()]
+    unknown = [item for item in items if choices and item not in choices]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown value(s): {unknown}")
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        type=lambda v: parse_list(v, None, int),
+        default=list(SIZES),
+        help="Comma-separated feature counts",
+    )
+    parser.add_argument(
+        "--types",
+        type=lambda v: parse_list(v, DATA_TYPES),
+        default=list(DATA_TYPES),
+        help="Comma-separated data types (points, routes, polygons)",
+    )
+    parser.add_argument(
+        "--formats",
+        type=lambda v: parse_list(v, FORMATS),
+        default=list(FORMATS),
+        help=f"Comma-separated upload formats ({', '.join(FORMATS)})",
+    )
+    parser.add_argument(
+        "--seed-features", type=int, default=2000, help="Features generated before repeating"
+    )
+    parser.add_argument(
+        "--data-dir", type=Path, default=Path("data/benchmarks"), help="Generated file cache"
+    )
+    parser.add_argument("--output", type=Path, help="JSON results file (default: in --data-dir)")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Slowdown reported as a regression"
+    )
+    parser.add_argument("--gpkg-workers", type=int, default=1, help="GeoPackage layer workers")
+    parser.add_argument("--keep-layers", action="store_true", help="Keep the ingested layers")
+    args = parser.parse_args()
+
+    revision = git_revision()
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    results = []
+    for data_type in args.types:
+        for features in args.sizes:
+            formats = [fmt for fmt in args.formats if data_type in FORMATS[fmt][1]]
+            prepared = prepare_files(
+                data_type, features, formats, args.data_dir, args.seed_features
+            )
+            for fmt in formats:
+                processor = FORMATS[fmt][0]
+                case = {
+                    "processor": processor,
+                    "files": {key: str(path) for key, path in prepared[fmt].items()},
+                    "layer_name": f"bench_{data_type}_{features}_{fmt}_{run_id}",
+                    "gpkg_workers": args.gpkg_workers,
+                    "keep_layers": args.keep_layers,
+                }
+                # A fresh process per case keeps peak RSS and imports independent
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                    try:
+                        measured = pool.submit(run_case, case).result()
+                    except Exception as e:
+                        measured = {"success": False, "error": str(e), "features_per_second": 0}
+
+                result = {
+                    "data_type": data_type,
+                    "features": features,
+                    "format": fmt,
+                    "processor": processor,
+                    **measured,
+                }
+                results.append(result)
+                status = (
+                    f"{result['features_per_second']:>12,.0f} features/s "
+                    f"{result['peak_rss_mb']:>8,.0f} MB peak"
+                    if result["success"]
+                    else f"failed: {result['error']}"
+                )
+                print(f"{case_key(result):<36} {status}", file=sys.stderr)
+
+    report = {
+        **revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed_features": args.seed_features,
+        "results": results,
+    }
+    output = args.output or args.data_dir / f"ingest_{(revision['commit'] or run_id)[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
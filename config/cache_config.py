@@ -0,0 +1,13 @@
+import os
+
+# Serialized layer cache configuration
+CACHE_CONFIG = {
+    # Memory held by cached layer payloads in each process, in compressed bytes (0 disables)
+    "max_bytes": int(os.getenv("LAYER_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+    # Largest compressed payload cached; bigger layers are always streamed from the database
+    "max_entry_bytes": int(os.getenv("LAYER_CACHE_MAX_ENTRY_BYTES", 64 * 1024 * 1024)),
+    # Directory shared by all processes to keep payloads in beyond memory (unset for memory only)
+    "directory": os.getenv("LAYER_CACHE_DIR") or None,
+    # Disk space used by the directory, in bytes
+    "disk_max_bytes": int(os.getenv("LAYER_CACHE_DISK_MAX_BYTES", 2 * 1024 * 1024 * 1024)),
+}
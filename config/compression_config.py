@@ -0,0 +1,17 @@
+import os
+
+# HTTP response compression configuration
+COMPRESSION_CONFIG = {
+    # Responses smaller than this (bytes) are sent uncompressed; streamed ones are always compressed
+    "min_size": int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    # Levels used while responding, favouring speed
+    "levels": {
+        "gzip": int(os.getenv("GZIP_LEVEL", 6)),
+        "br": int(os.getenv("BROTLI_QUALITY", 4)),
+    },
+    # Levels for payloads kept in the layer cache, which are compressed once and sent many times
+    "cached_levels": {
+        "gzip": int(os.getenv("CACHED_GZIP_LEVEL", 9)),
+        "br": int(os.getenv("CACHED_BROTLI_QUALITY", 9)),
+    },
+}
@@ -0,0 +1,27 @@
+import os
+
+# Ingestion configuration
+INGEST_CONFIG = {
+    # Number of features written per COPY / multi-row INSERT batch
+    "batch_size": int(os.getenv("INGEST_BATCH_SIZE", 5000)),
+    # Uploads up to this size (bytes) are read from memory instead of a temporary file
+    "in_memory_threshold": int(os.getenv("INMEMORY_UPLOAD_THRESHOLD", 64 * 1024 * 1024)),
+    # GeoJSON files at or above this size (bytes) are parsed incrementally
+    "geojson_stream_threshold": int(os.getenv("GEOJSON_STREAM_THRESHOLD", 256 * 1024 * 1024)),
+    # CSV files at or above this size (bytes) are read in chunks of batch_size rows
+    "csv_chunk_threshold": int(os.getenv("CSV_CHUNK_THRESHOLD", 128 * 1024 * 1024)),
+    # Worker processes used to ingest GeoPackage layers concurrently (1 = sequential)
+    "gpkg_max_workers": int(os.getenv("GPKG_MAX_WORKERS", 1)),
+    # Threads used to validate and repair geometries of large layers
+    "geometry_repair_workers": int(os.getenv("GEOMETRY_REPAIR_WORKERS", os.cpu_count() or 1)),
+    # Geometries per chunk when validating and repairing in parallel
+    "geometry_repair_chunk_size": int(os.getenv("GEOMETRY_REPAIR_CHUNK_SIZE", 50000)),
+    # What to do when an upload matches a previous one: "ingest", "reuse" or "clone"
+    "on_duplicate": os.getenv("DUPLICATE_UPLOADS", "ingest"),
+    # Threads executing queued upload jobs in each web process
+    "job_workers": int(os.getenv("INGEST_JOB_WORKERS", 2)),
+    # Seconds without progress after which a "processing" upload counts as interrupted
+    "job_lease": int(os.getenv("INGEST_JOB_LEASE", 900)),
+    # Directory where queued uploads are staged until their job finishes
+    "job_dir": os.getenv("INGEST_JOB_DIR", "data/uploads/jobs"),
+}
@@ -0,0 +1,54 @@
+import os
+from typing import Optional
+
+
+def _zoom_limits(value: str) -> dict:
+    """Parse "zoom:limit" pairs such as "0:2000,8:20000" into {zoom: limit}"""
+    pairs = (item.split(":") for item in value.split(",") if item.strip())
+    return {int(zoom): int(limit) for zoom, limit in pairs}
+
+
+def _zoom_list(value: str) -> list:
+    """Parse a comma-separated list of zoom levels"""
+    return sorted(int(zoom) for zoom in value.split(",") if zoom.strip())
+
+
+# Vector tile configuration
+TILE_CONFIG = {
+    # Tile coordinate space and the extra margin (in tile units) kept around each tile
+    "extent": int(os.getenv("TILE_EXTENT", 4096)),
+    "buffer": int(os.getenv("TILE_BUFFER", 64)),
+    # Highest zoom level tiles are served for
+    "max_zoom": int(os.getenv("TILE_MAX_ZOOM", 22)),
+    # Most features per tile, by the lowest zoom level each limit applies from
+    "feature_limits": _zoom_limits(
+        os.getenv("TILE_FEATURE_LIMITS", "0:2000,4:10000,8:25000,12:50000")
+    ),
+    # Zoom levels lines and polygons get a simplified copy for at ingest (empty to disable);
+    # beyond the highest one, full-resolution geometries are served
+    "simplify_zooms": _zoom_list(os.getenv("SIMPLIFY_ZOOMS", "4,7,10,13")),
+}
+
+
+def tile_feature_limit(zoom: int) -> int:
+    """Get the feature limit for tiles at a zoom level"""
+    limits = TILE_CONFIG["feature_limits"]
+    applicable = [level for level in limits if level <= zoom]
+    return limits[max(applicable)] if applicable else limits[min(limits)]
+
+
+def simplify_tolerance(zoom: int) -> float:
+    """Get the simplification tolerance for a zoom level: the size of a tile pixel in degrees"""
+    return 360.0 / (256 * 2**zoom)
+
+
+def simplification_zoom(zoom: int) -> Optional[int]:
+    """
+    Get the simplified geometry level to serve at a zoom level
+
+    That is the lowest simplified zoom at or above the requested one, whose
+    tolerance is at most a pixel at the requested zoom; None when only the
+    full-resolution geometries are fine enough.
+    """
+    finer = [level for level in TILE_CONFIG["simplify_zooms"] if level >= zoom]
+    return min(finer) if finer else None
@@ -50,5 +50,61 @@ def status():
         click.echo("Failed to get table counts")
 
 
+@cli.command()
+@click.argument("upload_id", type=int)
+def resume(upload_id):
+    """Resume an interrupted upload from its last committed batch"""
+    from app.jobs import resume_upload_job
+
+    result = resume_upload_job(upload_id)
+    if result.get("success"):
+        click.echo(
+            f"Successfully resumed upload {upload_id}: "
+            f"{result.get('feature_count')} features added to layer {result.get('layer_id')}"
+        )
+    else:
+        click.echo(f"Failed to resume upload {upload_id}: {result.get('error')}")
+
+
+@cli.command()
+@click.argument("layer_id", type=int)
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["fgb", "parquet", "arrow"]),
+    help="Export format (defaults to the output file's extension)",
+)
+def export(layer_id, output, fmt):
+    """Export a layer as FlatGeobuf, GeoParquet or Arrow IPC"""
+    from pathlib import Path
+    from app.database.base import SessionLocal
+    from app.database import crud
+    from app.database.export import write_layer_export
+    from tools.io.writers import EXPORT_FORMATS
+
+    if fmt is None:
+        extension = Path(output).suffix.lower()
+        fmt = next(
+            (name for name, spec in EXPORT_FORMATS.items() if spec["extension"] == extension),
+            None,
+        )
+        if fmt is None:
+            raise click.UsageError(f"Cannot tell the format of {output}, use --format")
+
+    db = SessionLocal()
+    try:
+        layer = crud.get_layer_by_id(db, layer_id)
+        if not layer:
+            click.echo(f"Layer {layer_id} not found")
+            return
+        write_layer_export(db, layer, fmt, output)
+        click.echo(f"Exported layer {layer_id} ({layer.name}) to {output}")
+    except Exception as e:
+        click.echo(f"Failed to export layer {layer_id}: {e}")
+    finally:
+        db.close()
+
+
 if __name__ == "__main__":
     cli()
@@ -1,13 +1,43 @@
+import os
+import tempfile
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional, Union
+import geopandas as gpd
 from sqlalchemy.orm import Session
 from pathlib import Path
+from app.database import crud
+from app.models.spatial import SpatialLayer
+from config.ingest_config import INGEST_CONFIG
+from tools.io.uploads import StagedFile, upload_size
+from utils.logger import setup_logger
+from config.logging_config import CURRENT_LOGGING_CONFIG
+
+logger = setup_logger(
+    "base_processor",
+    log_level=CURRENT_LOGGING_CONFIG["log_level"],
+    log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
+)
 
 
 class BaseDataProcessor(ABC):
-    def __init__(self, upload_dir: str = "data/uploads"):
+    def __init__(self, upload_dir: str = "data/uploads", batch_size: int = None):
         self.upload_dir = Path(upload_dir)
         self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size or INGEST_CONFIG["batch_size"]
+        # Called with the running total of features written, e.g. by background jobs
+        self.progress_callback: Optional[Callable[[int], None]] = None
+        self.features_processed = 0
+        # Set by background jobs: batches are checkpointed in this UploadHistory record
+        self.upload_id: Optional[int] = None
+        # Checkpoint of an interrupted upload ({"layer_id", "batch", "rows"}) to continue from
+        self.resume_from: Optional[Dict[str, int]] = None
+        # "insert" creates a new layer; "append" and "upsert" write into the existing layer
+        # named layer_name, upserts matching features on key_column
+        self.write_mode = "insert"
+        self.key_column: Optional[str] = None
+        # Counts from the last bulk load (inserted, updated, unchanged, ...)
+        self.write_stats: Dict[str, Any] = {}
 
     @abstractmethod
     def validate_files(self, files: Dict[str, Any]) -> bool:
@@ -35,3 +65,170 @@ class BaseDataProcessor(ABC):
     def get_file_extensions(self) -> set:
         """Return a set of allowed file extensions"""
         pass
+
+    @contextmanager
+    def _open_upload(self, file: Any, suffix: str) -> Iterator[Union[bytes, Path]]:
+        """
+        Provide an uploaded file in the form cheapest to read
+
+        Files already staged on disk are read in place. Uploads up to the
+        in-memory threshold are returned as bytes, which pyogrio reads through
+        GDAL's /vsimem/ and pandas through a buffer. Larger uploads are saved
+        to a uniquely named file in the upload directory, so concurrent jobs
+        never share one, and removed afterwards.
+
+        Args:
+            file: Uploaded file (FileStorage, StagedFile or InMemoryFile)
+            suffix: File extension of the upload if it has to go to disk, e.g. ".csv"
+
+        Yields:
+            The upload's bytes or a path to it
+        """
+        if isinstance(file, StagedFile):
+            yield file.path
+            return
+
+        size = upload_size(file)
+        if size is not None and size <= INGEST_CONFIG["in_memory_threshold"]:
+            logger.debug(f"Reading {size} byte upload from memory")
+            yield file.read()
+            return
+
+        fd, temp_name = tempfile.mkstemp(suffix=suffix, dir=self.upload_dir)
+        os.close(fd)
+        temp_path = Path(temp_name)
+        try:
+            file.save(temp_path)
+            yield temp_path
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def _create_layer(
+        self, db_session: Session, name: str, description: str, geometry_type: str
+    ) -> SpatialLayer:
+        """
+        Create the target layer, or reopen it when resuming an interrupted upload
+
+        In append and upsert mode the existing layer with the given name is
+        used instead, and its geometry type widened if the new features differ.
+        """
+        layer = None
+        if self.resume_from and self.resume_from.get("layer_id"):
+            layer = crud.get_layer_by_id(db_session, self.resume_from["layer_id"])
+            if layer:
+                logger.info(f"Resuming layer {layer.id} after {self.resume_from['rows']} rows")
+
+        if layer is None and self.write_mode != "insert":
+            layer = crud.get_layer_by_name(db_session, name)
+            if layer is None:
+                raise ValueError(
+                    f"Layer '{name}' not found; {self.write_mode} needs an existing layer"
+                )
+            logger.info(f"Writing to existing layer {layer.id} in {self.write_mode} mode")
+            if layer.geometry_type != geometry_type and layer.geometry_type != "GEOMETRY":
+                crud.update_layer_geometry_type(db_session, layer.id, "GEOMETRY")
+
+        if layer is None:
+            layer = crud.create_spatial_layer(
+                db=db_session,
+                name=name,
+                description=description,
+                geometry_type=geometry_type,
+            )
+
+        if self.upload_id:
+            crud.update_upload_history(db_session, self.upload_id, layer_id=layer.id)
+        return layer
+
+    def _process_features(
+        self,
+        gdf: Union[gpd.GeoDataFrame, Iterable[gpd.GeoDataFrame]],
+        layer_id: int,
+        db_session: Session,
+    ) -> int:
+        """Bulk load features from a GeoDataFrame (or iterator of batches) into the database"""
+        features = gdf
+        if self.resume_from and self.resume_from.get("rows"):
+            features = _skip_rows(features, self.resume_from["rows"])
+
+        result = crud.add_features_bulk(
+            db=db_session,
+            layer_id=layer_id,
+            features=features,
+            batch_size=self.batch_size,
+            on_batch=self._record_progress,
+            checkpoint=self._checkpoint_writer(db_session),
+            mode=self.write_mode,
+            key_column=self.key_column,
+        )
+        self.write_stats = {
+            key: result[key] for key in ("inserted", "updated", "unchanged", "failed", "skipped")
+        }
+
+        for failure in result["failures"]:
+            logger.error(
+                f"Error adding batch {failure['batch']} ({failure['rows']} features) "
+                f"to layer {layer_id}: {failure['error']}"
+            )
+        if result["skipped"]:
+            logger.warning(f"Skipped {result['skipped']} features without geometry or key")
+        if self.write_mode != "insert":
+            logger.info(
+                f"{self.write_mode.capitalize()} into layer {layer_id}: {result['inserted']} new, "
+                f"{result['updated']} updated, {result['unchanged']} unchanged"
+            )
+
+        if result["inserted"] or result["updated"]:
+            try:
+                simplified = crud.build_simplified_geometries(db_session, layer_id)
+                logger.info(f"Stored {simplified} simplified geometries for layer {layer_id}")
+            except Exception as e:
+                # Readers fall back to the full-resolution geometries
+                logger.warning(f"Failed to simplify geometries of layer {layer_id}: {e}")
+            crud.bump_layer_version(db_session, layer_id)
+
+        return result["inserted"] + result["updated"]
+
+    def _record_progress(self, features_written: int) -> None:
+        """Accumulate written features and report the running total"""
+        self.features_processed += features_written
+        if self.progress_callback:
+            try:
+                self.progress_callback(self.features_processed)
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
+
+    def _checkpoint_writer(self, db_session: Session) -> Optional[Callable[[int, int], None]]:
+        """Build the callback that records committed batches for the current upload"""
+        if not self.upload_id:
+            return None
+
+        start = self.resume_from or {}
+        start_batch = start.get("batch", 0)
+        start_rows = start.get("rows", 0)
+
+        def write_checkpoint(batch_number: int, rows_consumed: int) -> None:
+            crud.record_upload_checkpoint(
+                db_session,
+                self.upload_id,
+                batch=start_batch + batch_number + 1,
+                rows=start_rows + rows_consumed,
+            )
+
+        return write_checkpoint
+
+
+def _skip_rows(
+    features: Union[gpd.GeoDataFrame, Iterable[gpd.GeoDataFrame]], count: int
+) -> Iterator[gpd.GeoDataFrame]:
+    """Drop the first count rows from a GeoDataFrame or a sequence of batches"""
+    if isinstance(features, gpd.GeoDataFrame):
+        features = [features]
+
+    for gdf in features:
+        if count >= len(gdf):
+            count -= len(gdf)
+            continue
+        yield gdf.iloc[count:]
+        count = 0
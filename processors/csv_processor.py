@@ -1,11 +1,15 @@
 import pandas as pd
 import geopandas as gpd
+import io
+import itertools
 from typing import Dict, Any, List, Tuple, Optional
 from sqlalchemy.orm import Session
 from pathlib import Path
 from app.database import crud
 from processors.base_processor import BaseDataProcessor
 from tools.ai.smart_processor import SmartProcessor
+from config.ingest_config import INGEST_CONFIG
+from tools.io.uploads import source_size
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
 
@@ -17,8 +21,8 @@ logger = setup_logger(
 
 
 class CSVProcessor(BaseDataProcessor):
-    def __init__(self, upload_dir: str = "data/uploads"):
-        super().__init__(upload_dir)
+    def __init__(self, upload_dir: str = "data/uploads", batch_size: int = None):
+        super().__init__(upload_dir, batch_size)
         self.smart_processor = SmartProcessor()
 
     def get_required_files(self) -> Dict[str, str]:
@@ -39,79 +43,121 @@ class CSVProcessor(BaseDataProcessor):
         selected_layer: str = None,
         lat_column: str = None,
         lon_column: str = None,
+        chunksize: Optional[int] = None,
     ) -> Dict[str, Any]:
-        try:
-            # Save CSV file temporarily
-            csv_file = files["file_csv"]
-            safe_name = layer_name.replace(" ", "_") if layer_name else "temp"
-            temp_path = self.upload_dir / f"{safe_name}_temp.csv"
-            csv_file.save(temp_path)
-
-            try:
-                df = pd.read_csv(temp_path)
+        """
+        Process a CSV upload and store it in the database
 
-                # Validate and identify coordinate columns
-                lat_col, lon_col = self._identify_coordinate_columns(df, lat_column, lon_column)
+        Files at or above the configured size threshold (or when chunksize is
+        given) are read in chunks; each chunk is converted to points and
+        written before the next one is read, so memory use stays flat.
+        """
+        try:
+            # Read small uploads from memory, larger ones from a temporary file
+            reader = None
+
+            with self._open_upload(files["file_csv"], ".csv") as source:
+                try:
+                    if chunksize is None and (
+                        source_size(source) >= INGEST_CONFIG["csv_chunk_threshold"]
+                    ):
+                        chunksize = self.batch_size
+
+                    if isinstance(source, bytes):
+                        source = io.BytesIO(source)
+
+                    # Both paths use the C parser, which can read in chunks, so a
+                    # file's columns get the same types whichever way it is read
+                    if chunksize:
+                        reader = pd.read_csv(source, chunksize=chunksize)
+                        chunks = reader
+                    else:
+                        chunks = iter([pd.read_csv(source)])
+
+                    first_chunk = next(chunks, None)
+                    if first_chunk is None or first_chunk.empty:
+                        return {"success": False, "error": "CSV file contains no rows"}
+
+                    # Validate and identify coordinate columns once, from the first chunk
+                    lat_col, lon_col = self._identify_coordinate_columns(
+                        first_chunk, lat_column, lon_column
+                    )
+
+                    if not (lat_col and lon_col):
+                        return {
+                            "success": False,
+                            "error": "Could not identify latitude and longitude columns",
+                        }
+
+                    # Create GeoDataFrame
+                    first_gdf = self._to_geodataframe(first_chunk, lat_col, lon_col)
+
+                    # AI Analysis (on the first chunk when reading in chunks)
+                    ai_analysis = self.smart_processor.analyze_dataset(first_gdf, layer_name)
+
+                    # Use AI-suggested name and description if not provided
+                    if not layer_name and ai_analysis.get("suggested_name"):
+                        layer_name = ai_analysis["suggested_name"]
+
+                    if not description and ai_analysis.get("suggested_description"):
+                        description = ai_analysis["suggested_description"]
+
+                    # Create the layer
+                    layer = self._create_layer(
+                        db_session=db_session,
+                        name=layer_name,
+                        description=description,
+                        geometry_type="POINT",
+                    )
+
+                    stats = {"total_features": 0}
+
+                    def geodataframes():
+                        # Each chunk is converted and written as it arrives
+                        for chunk in itertools.chain([first_gdf], chunks):
+                            if chunk is not first_gdf:
+                                chunk = self._to_geodataframe(chunk, lat_col, lon_col)
+                            stats["total_features"] += len(chunk)
+                            yield chunk
+
+                    # Process features
+                    features_added = self._process_features(geodataframes(), layer.id, db_session)
+
+                    logger.info(f"AI Analysis for {layer_name}:")
+                    logger.info(f"Suggested Name: {ai_analysis.get('suggested_name')}")
+                    logger.info(
+                        f"Suggested Description: {ai_analysis.get('suggested_description')}"
+                    )
+                    logger.info(f"Data Quality Report: {ai_analysis.get('data_quality')}")
 
-                if not (lat_col and lon_col):
                     return {
-                        "success": False,
-                        "error": "Could not identify latitude and longitude columns",
+                        "success": True,
+                        "message": "CSV data processed successfully",
+                        "layer_id": layer.id,
+                        "feature_count": features_added,
+                        "total_features": stats["total_features"],
+                        "geometry_type": "POINT",
+                        "crs": "EPSG:4326",
+                        "ai_analysis": {
+                            "data_quality": ai_analysis.get("data_quality"),
+                            "clusters": ai_analysis.get("clusters"),
+                        },
                     }
 
-                # Create GeoDataFrame
-                geometry = gpd.points_from_xy(df[lon_col], df[lat_col])
-                gdf = gpd.GeoDataFrame(df, crs="EPSG:4326", geometry=geometry)
-
-                # AI Analysis
-                ai_analysis = self.smart_processor.analyze_dataset(gdf, layer_name)
-
-                # Use AI-suggested name and description if not provided
-                if not layer_name and ai_analysis.get("suggested_name"):
-                    layer_name = ai_analysis["suggested_name"]
-
-                if not description and ai_analysis.get("suggested_description"):
-                    description = ai_analysis["suggested_description"]
-
-                # Create the layer
-                layer = crud.create_spatial_layer(
-                    db=db_session,
-                    name=layer_name,
-                    description=description,
-                    geometry_type="POINT",
-                )
-
-                # Process features
-                features_added = self._process_features(gdf, layer.id, db_session)
-
-                logger.info(f"AI Analysis for {layer_name}:")
-                logger.info(f"Suggested Name: {ai_analysis.get('suggested_name')}")
-                logger.info(f"Suggested Description: {ai_analysis.get('suggested_description')}")
-                logger.info(f"Data Quality Report: {ai_analysis.get('data_quality')}")
-
-                return {
-                    "success": True,
-                    "message": "CSV data processed successfully",
-                    "layer_id": layer.id,
-                    "feature_count": features_added,
-                    "total_features": len(gdf),
-                    "geometry_type": "POINT",
-                    "crs": "EPSG:4326",
-                    "ai_analysis": {
-                        "data_quality": ai_analysis.get("data_quality"),
-                        "clusters": ai_analysis.get("clusters"),
-                    },
-                }
-
-            finally:
-                # Clean up
-                if temp_path.exists():
-                    temp_path.unlink()
+                finally:
+                    # Clean up
+                    if reader is not None:
+                        reader.close()
 
         except Exception as e:
             logger.error(f"Error processing CSV: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    def _to_geodataframe(self, df: pd.DataFrame, lat_col: str, lon_col: str) -> gpd.GeoDataFrame:
+        """Build a point GeoDataFrame from the coordinate columns of a DataFrame"""
+        geometry = gpd.points_from_xy(df[lon_col], df[lat_col])
+        return gpd.GeoDataFrame(df, crs="EPSG:4326", geometry=geometry)
+
     def _identify_coordinate_columns(
         self,
         df: pd.DataFrame,
@@ -145,34 +191,3 @@ class CSVProcessor(BaseDataProcessor):
                 break
 
         return lat_col, lon_col
-
-    def _process_features(self, gdf: gpd.GeoDataFrame, layer_id: int, db_session: Session) -> int:
-        """Process features from a GeoDataFrame into the database"""
-        features_added = 0
-        for idx, row in gdf.iterrows():
-            try:
-                geometry = row.geometry.__geo_interface__
-
-                # Clean properties before storing
-                properties = row.drop("geometry").to_dict()
-                cleaned_properties = {}
-
-                for key, value in properties.items():
-                    if pd.isna(value):  # Check for NaN or None
-                        cleaned_properties[key] = None
-                    else:
-                        cleaned_properties[key] = value
-
-                crud.add_feature(
-                    db=db_session,
-                    layer_id=layer_id,
-                    geometry=geometry,
-                    properties=cleaned_properties,
-                )
-                features_added += 1
-
-            except Exception as e:
-                logger.error(f"Error adding feature {idx}: {e}")
-                continue
-
-        return features_added
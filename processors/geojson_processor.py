@@ -1,16 +1,19 @@
 import geopandas as gpd
-from typing import Dict, Any, Union
-import pandas as pd
+import itertools
+from typing import Dict, Any, Optional, Union
 from sqlalchemy.orm import Session
 from pathlib import Path
 from app.database import crud
 from processors.base_processor import BaseDataProcessor
 from tools.ai.smart_processor import SmartProcessor
 from tools.conversion.crs_correction import standardize_crs
+from tools.io.geojson_stream import detect_encoding, iter_geojson_batches
+from tools.io.readers import read_vector
 from tools.validation.geometry import check_geometry_types, validate_and_fix_geometries
+from config.ingest_config import INGEST_CONFIG
+from tools.io.uploads import source_size
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
-import json
 
 logger = setup_logger(
     "geojson_processor",
@@ -20,8 +23,8 @@ logger = setup_logger(
 
 
 class GeoJSONProcessor(BaseDataProcessor):
-    def __init__(self, upload_dir: str = "data/uploads"):
-        super().__init__(upload_dir)
+    def __init__(self, upload_dir: str = "data/uploads", batch_size: int = None):
+        super().__init__(upload_dir, batch_size)
         self.smart_processor = SmartProcessor()
 
     def get_required_files(self) -> Dict[str, str]:
@@ -40,42 +43,42 @@ class GeoJSONProcessor(BaseDataProcessor):
         db_session: Session,
         description: str = "",
         selected_layer: str = None,
+        stream: Optional[bool] = None,
     ) -> Dict[str, Any]:
+        """
+        Process a GeoJSON upload and store it in the database
+
+        Files at or above the configured size threshold (or when stream=True)
+        are parsed incrementally and written in batches, so memory use does
+        not grow with file size.
+        """
         try:
-            # Save GeoJSON file temporarily
-            geojson_file = files["file_geojson"]
-            safe_name = layer_name.replace(" ", "_") if layer_name else "temp"
-            temp_path = self.upload_dir / f"{safe_name}_temp.geojson"
-            geojson_file.save(temp_path)
-
-            try:
-                # Validate GeoJSON structure
-                encodings_to_try = ["utf-8", "utf-8-sig", "latin-1", "cp1252"]
-                json_data = None
-
-                for encoding in encodings_to_try:
-                    try:
-                        with open(temp_path, "r", encoding=encoding) as f:
-                            try:
-                                json_data = json.load(f)
-                                logger.debug(f"Successfully read file with {encoding} encoding")
-                                break
-                            except json.JSONDecodeError:
-                                continue
-                    except UnicodeDecodeError:
-                        continue
-
-                if json_data is None:
+            # Read small uploads from memory, larger ones from a temporary file
+
+            with self._open_upload(files["file_geojson"], ".geojson") as source:
+                # Detect the encoding from a sample instead of parsing the whole file
+                encoding = detect_encoding(source)
+                if encoding is None:
                     return {
                         "success": False,
                         "error": "Unable to read GeoJSON file. File may be corrupted or using unsupported encoding.",
                     }
+                logger.debug(f"Detected {encoding} encoding")
+
+                if stream is None:
+                    stream = source_size(source) >= INGEST_CONFIG["geojson_stream_threshold"]
 
-                # Read GeoJSON file with detected encoding
-                logger.info(f"Reading GeoJSON from: {temp_path}")
-                gdf = gpd.read_file(
-                    temp_path, encoding="utf-8"
-                )  # GeoJSON should be UTF-8 after json.load
+                if stream:
+                    return self._process_streaming(
+                        file_path=source,
+                        encoding=encoding,
+                        layer_name=layer_name,
+                        db_session=db_session,
+                        description=description,
+                    )
+
+                logger.info(f"Reading GeoJSON from: {_describe(source)}")
+                gdf = self._standardize(read_vector(source, encoding=encoding))
 
                 # AI Analysis
                 ai_analysis = self.smart_processor.analyze_dataset(gdf, layer_name)
@@ -91,8 +94,8 @@ class GeoJSONProcessor(BaseDataProcessor):
                 geometry_type = check_geometry_types(gdf)
 
                 # Create the layer
-                layer = crud.create_spatial_layer(
-                    db=db_session,
+                layer = self._create_layer(
+                    db_session=db_session,
                     name=layer_name,
                     description=description,
                     geometry_type=geometry_type,
@@ -121,70 +124,90 @@ class GeoJSONProcessor(BaseDataProcessor):
                     },
                 }
 
-            finally:
-                # Clean up
-                if temp_path.exists():
-                    temp_path.unlink()
-
         except Exception as e:
             logger.error(f"Error processing GeoJSON: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
-    def _load_and_standardize_geodataframe(self, file_path: Union[str, Path]) -> gpd.GeoDataFrame:
-        """Load and standardize a GeoDataFrame from a GeoJSON file"""
-        try:
-            # Try different encodings
-            encodings_to_try = ["utf-8", "utf-8-sig", "latin-1", "cp1252"]
-
-            for encoding in encodings_to_try:
-                try:
-                    gdf = gpd.read_file(file_path, encoding=encoding)
-                    logger.debug(f"Successfully read file with {encoding} encoding")
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                raise ValueError("Unable to read file with any supported encoding")
-
-            # Handle CRS
-            gdf = standardize_crs(gdf)
-
-            # Validate and fix geometries
-            gdf = validate_and_fix_geometries(gdf)
-
-            return gdf
-
-        except Exception as e:
-            logger.error(f"Error loading geodataframe: {e}", exc_info=True)
-            raise
-
-    def _process_features(self, gdf: gpd.GeoDataFrame, layer_id: int, db_session: Session) -> int:
-        """Process features from a GeoDataFrame into the database"""
-        features_added = 0
-        for idx, row in gdf.iterrows():
-            try:
-                geometry = row.geometry.__geo_interface__
-
-                # Clean properties before storing
-                properties = row.drop("geometry").to_dict()
-                cleaned_properties = {}
-
-                for key, value in properties.items():
-                    if pd.isna(value):
-                        cleaned_properties[key] = None
-                    else:
-                        cleaned_properties[key] = value
-
-                crud.add_feature(
-                    db=db_session,
-                    layer_id=layer_id,
-                    geometry=geometry,
-                    properties=cleaned_properties,
-                )
-                features_added += 1
-
-            except Exception as e:
-                logger.error(f"Error adding feature {idx}: {e}")
-                continue
-
-        return features_added
+    def _process_streaming(
+        self,
+        file_path: Union[Path, bytes],
+        encoding: str,
+        layer_name: str,
+        db_session: Session,
+        description: str = "",
+    ) -> Dict[str, Any]:
+        """Stream a GeoJSON FeatureCollection into the database batch by batch"""
+        logger.info(f"Streaming GeoJSON from: {_describe(file_path)}")
+        batches = iter_geojson_batches(file_path, self.batch_size, encoding=encoding)
+
+        first_batch = next(batches, None)
+        if first_batch is None or first_batch.empty:
+            return {"success": False, "error": "GeoJSON file contains no features"}
+        first_batch = self._standardize(first_batch)
+
+        # AI analysis runs on the first batch as a sample of the dataset
+        ai_analysis = self.smart_processor.analyze_dataset(first_batch, layer_name)
+
+        if not layer_name and ai_analysis.get("suggested_name"):
+            layer_name = ai_analysis["suggested_name"]
+
+        if not description and ai_analysis.get("suggested_description"):
+            description = ai_analysis["suggested_description"]
+
+        geometry_type = check_geometry_types(first_batch)
+
+        layer = self._create_layer(
+            db_session=db_session,
+            name=layer_name,
+            description=description,
+            geometry_type=geometry_type,
+        )
+
+        stats = {"total_features": 0, "geometry_types": set()}
+
+        def standardized_batches():
+            for batch in itertools.chain([first_batch], batches):
+                if batch is not first_batch:
+                    batch = self._standardize(batch)
+                stats["total_features"] += len(batch)
+                stats["geometry_types"].add(check_geometry_types(batch))
+                yield batch
+
+        features_added = self._process_features(standardized_batches(), layer.id, db_session)
+
+        # Later batches may introduce other geometry types than the sampled one
+        if len(stats["geometry_types"]) > 1:
+            geometry_type = "GEOMETRY"
+            crud.update_layer_geometry_type(db_session, layer.id, geometry_type)
+
+        logger.info(f"AI Analysis for {layer_name}:")
+        logger.info(f"Suggested Name: {ai_analysis.get('suggested_name')}")
+        logger.info(f"Suggested Description: {ai_analysis.get('suggested_description')}")
+        logger.info(f"Data Quality Report: {ai_analysis.get('data_quality')}")
+
+        return {
+            "success": True,
+            "message": "GeoJSON processed successfully",
+            "layer_id": layer.id,
+            "layer_name": layer_name,
+            "feature_count": features_added,
+            "total_features": stats["total_features"],
+            "geometry_type": geometry_type,
+            "crs": "EPSG:4326",
+            "ai_analysis": {
+                "data_quality": ai_analysis.get("data_quality"),
+                "clusters": ai_analysis.get("clusters"),
+            },
+        }
+
+    def _standardize(self, gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+        """Standardize CRS and repair geometries, alike for whole files and streamed batches"""
+        gdf = standardize_crs(gdf)
+        return validate_and_fix_geometries(gdf)
+
+
+def _describe(source: Union[Path, bytes]) -> str:
+    """Describe an opened upload for log messages"""
+    if isinstance(source, bytes):
+        return f"memory ({len(source)} bytes)"
+    return str(source)
@@ -1,15 +1,18 @@
+import multiprocessing
 import geopandas as gpd
-import fiona
-from typing import Dict, Any, List
-
-import pandas as pd
+import pyogrio
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Union
 from sqlalchemy.orm import Session
 from pathlib import Path
 from app.database import crud
+from app.database.base import SessionLocal
 from processors.base_processor import BaseDataProcessor
 from tools.ai.smart_processor import SmartProcessor
 from tools.conversion.crs_correction import standardize_crs
+from tools.io.readers import read_vector
 from tools.validation.geometry import check_geometry_types, validate_and_fix_geometries
+from config.ingest_config import INGEST_CONFIG
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
 
@@ -21,8 +24,8 @@ logger = setup_logger(
 
 
 class GeoPackageProcessor(BaseDataProcessor):
-    def __init__(self, upload_dir: str = "data/uploads"):
-        super().__init__(upload_dir)
+    def __init__(self, upload_dir: str = "data/uploads", batch_size: int = None):
+        super().__init__(upload_dir, batch_size)
         self.smart_processor = SmartProcessor()
 
     def get_required_files(self) -> Dict[str, str]:
@@ -41,30 +44,48 @@ class GeoPackageProcessor(BaseDataProcessor):
         db_session: Session,
         description: str = "",
         selected_layer: str = None,
+        max_workers: Optional[int] = None,
     ) -> Dict[str, Any]:
+        """
+        Process every layer of a GeoPackage upload and store it in the database
+
+        With max_workers > 1 (or GPKG_MAX_WORKERS set), layers are ingested
+        concurrently in a process pool; each worker opens its own reader and
+        database session, and progress is reported as each layer completes.
+        The summary has the same shape either way.
+        """
+        if self.write_mode != "insert":
+            return {"success": False, "error": "GeoPackage uploads always create new layers"}
+
         try:
-            # Save GPKG file temporarily
-            gpkg_file = files["file_gpkg"]
-            safe_name = layer_name.replace(" ", "_") if layer_name else "temp"
-            temp_path = self.upload_dir / f"{safe_name}_temp.gpkg"
-            gpkg_file.save(temp_path)
+            # Read small uploads from memory, larger ones from a temporary file
 
-            try:
+            with self._open_upload(files["file_gpkg"], ".gpkg") as source:
                 # List available layers in the GeoPackage
-                available_layers = fiona.listlayers(str(temp_path))
+                available_layers = list(pyogrio.list_layers(source)[:, 0])
 
                 if not available_layers:
                     return {"success": False, "error": "No layers found in GeoPackage"}
 
-                # Process all layers
-                processed_layers = []
-                for layer_name in available_layers:
-                    result = self._process_single_layer(
-                        gpkg_path=temp_path,
-                        layer_name=layer_name,
-                        db_session=db_session,
+                # Process all layers, in parallel worker processes when configured
+                max_workers = min(
+                    max_workers or INGEST_CONFIG["gpkg_max_workers"], len(available_layers)
+                )
+                if max_workers > 1:
+                    processed_layers = self._process_layers_parallel(
+                        gpkg_path=source,
+                        layer_names=available_layers,
+                        max_workers=max_workers,
                     )
-                    processed_layers.append(result)
+                else:
+                    processed_layers = []
+                    for layer_name in available_layers:
+                        result = self._process_single_layer(
+                            gpkg_path=source,
+                            layer_name=layer_name,
+                            db_session=db_session,
+                        )
+                        processed_layers.append(result)
 
                 # Prepare summary result
                 successful_layers = [layer for layer in processed_layers if layer["success"]]
@@ -80,23 +101,62 @@ class GeoPackageProcessor(BaseDataProcessor):
                     "failed_layers": len(failed_layers),
                 }
 
-            finally:
-                # Clean up
-                if temp_path.exists():
-                    temp_path.unlink()
-
         except Exception as e:
             logger.error(f"Error processing GeoPackage: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    def _process_layers_parallel(
+        self, gpkg_path: Union[Path, bytes], layer_names: List[str], max_workers: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Process GeoPackage layers concurrently across a process pool
+
+        Workers are spawned rather than forked: the job runs in a thread of a
+        web process, and a forked child would inherit its locks and database
+        connections in whatever state the other threads left them. Workers
+        cannot reach the progress callback, so the features of each layer
+        are reported here once the layer completes.
+        """
+        logger.info(f"Processing {len(layer_names)} layers with {max_workers} workers")
+
+        processed_layers: List[Optional[Dict[str, Any]]] = [None] * len(layer_names)
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _process_layer_in_worker,
+                    gpkg_path if isinstance(gpkg_path, bytes) else str(gpkg_path),
+                    layer_name,
+                    str(self.upload_dir),
+                    self.batch_size,
+                ): index
+                for index, layer_name in enumerate(layer_names)
+            }
+
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(
+                        f"Worker failed on layer '{layer_names[index]}': {e}", exc_info=True
+                    )
+                    result = {"success": False, "source_layer": layer_names[index], "error": str(e)}
+                processed_layers[index] = result
+                if result["success"]:
+                    self._record_progress(result["feature_count"])
+
+        return processed_layers
+
     def _process_single_layer(
-        self, gpkg_path: Path, layer_name: str, db_session: Session
+        self, gpkg_path: Union[Path, bytes], layer_name: str, db_session: Session
     ) -> Dict[str, Any]:
         """Process a single layer from the GeoPackage"""
         try:
             # Read the layer
             logger.info(f"Reading layer '{layer_name}' from GeoPackage")
-            gdf = gpd.read_file(gpkg_path, layer=layer_name)
+            gdf = read_vector(gpkg_path, layer=layer_name)
 
             # Standardize the GeoDataFrame
             gdf = self._load_and_standardize_geodataframe(gdf)
@@ -152,33 +212,16 @@ class GeoPackageProcessor(BaseDataProcessor):
 
         return gdf
 
-    def _process_features(self, gdf: gpd.GeoDataFrame, layer_id: int, db_session: Session) -> int:
-        """Process features from a GeoDataFrame into the database"""
-        features_added = 0
-        for idx, row in gdf.iterrows():
-            try:
-                geometry = row.geometry.__geo_interface__
-
-                # Clean properties before storing
-                properties = row.drop("geometry").to_dict()
-                cleaned_properties = {}
-
-                for key, value in properties.items():
-                    if pd.isna(value):
-                        cleaned_properties[key] = None
-                    else:
-                        cleaned_properties[key] = value
-
-                crud.add_feature(
-                    db=db_session,
-                    layer_id=layer_id,
-                    geometry=geometry,
-                    properties=cleaned_properties,
-                )
-                features_added += 1
-
-            except Exception as e:
-                logger.error(f"Error adding feature {idx}: {e}")
-                continue
 
-        return features_added
+def _process_layer_in_worker(
+    gpkg_path: Union[str, bytes], layer_name: str, upload_dir: str, batch_size: int
+) -> Dict[str, Any]:
+    """Process a single GeoPackage layer in a worker process with its own session"""
+    processor = GeoPackageProcessor(upload_dir=upload_dir, batch_size=batch_size)
+    db_session = SessionLocal()
+    try:
+        if isinstance(gpkg_path, str):
+            gpkg_path = Path(gpkg_path)
+        return processor._process_single_layer(gpkg_path, layer_name, db_session)
+    finally:
+        db_session.close()
@@ -1,14 +1,16 @@
+import tempfile
 import geopandas as gpd
 from typing import Dict, Any, Union, Optional
 from sqlalchemy.orm import Session
 from pathlib import Path
-import math
-import pandas as pd
 from app.database import crud
 from processors.base_processor import BaseDataProcessor
 from tools.ai.smart_processor import SmartProcessor
 from tools.conversion.crs_correction import standardize_crs
+from tools.io.readers import list_zipped_shapefiles, read_vector, zipped_shapefile
+from tools.io.uploads import StagedFile, upload_size, zip_in_memory
 from tools.validation.geometry import validate_and_fix_geometries, check_geometry_types
+from config.ingest_config import INGEST_CONFIG
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
 
@@ -20,8 +22,11 @@ logger = setup_logger(
 
 
 class ShapefileProcessor(BaseDataProcessor):
-    def __init__(self, upload_dir: str = "data/uploads"):
-        super().__init__(upload_dir)
+    # Sidecar files used when uploaded: projection and attribute encoding
+    OPTIONAL_EXTENSIONS = {".prj", ".cpg"}
+
+    def __init__(self, upload_dir: str = "data/uploads", batch_size: int = None):
+        super().__init__(upload_dir, batch_size)
         self.smart_processor = SmartProcessor()
 
     def get_required_files(self) -> Dict[str, str]:
@@ -35,6 +40,8 @@ class ShapefileProcessor(BaseDataProcessor):
         return {".shp", ".shx", ".dbf"}
 
     def validate_files(self, files: Dict[str, Any]) -> bool:
+        if "file_zip" in files:
+            return True
         required_extensions = self.get_file_extensions()
         return all(f"file_{ext[1:]}" in files for ext in required_extensions)
 
@@ -47,18 +54,37 @@ class ShapefileProcessor(BaseDataProcessor):
         selected_layer: str = None,
     ) -> Dict[str, Any]:
         try:
-            # Create temporary directory for files
-            safe_name = layer_name.replace(" ", "_") if layer_name else "temp"
-            temp_dir = self.upload_dir / safe_name
-            temp_dir.mkdir(exist_ok=True)
+            if "file_zip" in files:
+                return self._process_archive(files["file_zip"], layer_name, db_session, description)
+
+            # Small uploads are bundled into an in-memory zip that GDAL reads via /vsizip/
+            if self._fits_in_memory(files):
+                members = {
+                    f"layer{ext}": files[f"file_{ext[1:]}"]
+                    for ext in self.get_file_extensions() | self.OPTIONAL_EXTENSIONS
+                    if f"file_{ext[1:]}" in files
+                }
+                if "layer.shp" not in members:
+                    return {"success": False, "error": "No .shp file found"}
+
+                logger.debug("Processing shapefile from memory")
+                return self.process_shapefile(
+                    shp_path=zip_in_memory(members),
+                    layer_name=layer_name,
+                    db_session=db_session,
+                    description=description,
+                )
+
+            # Create a temporary directory of this upload's own for the files
+            temp_dir = Path(tempfile.mkdtemp(dir=self.upload_dir))
             saved_paths = []
 
             try:
                 # Save files with consistent naming
-                base_filename = f"{safe_name}_temp"
+                base_filename = "layer"
                 shp_path = None
 
-                for ext in self.get_file_extensions():
+                for ext in self.get_file_extensions() | self.OPTIONAL_EXTENSIONS:
                     file_key = f"file_{ext[1:]}"
                     if file_key in files:
                         filepath = temp_dir / f"{base_filename}{ext}"
@@ -101,23 +127,102 @@ class ShapefileProcessor(BaseDataProcessor):
             logger.error(f"Error processing shapefile: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    def _process_archive(
+        self, file: Any, layer_name: str, db_session: Session, description: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Process a zip archive of one or more shapefiles without extracting it
+
+        GDAL reads the archive in place through /vsizip/, picking up each
+        shapefile's .prj and .cpg. An archive with a single shapefile is
+        processed like separately uploaded components; with several, each
+        becomes its own layer named after the upload and the shapefile, and
+        the summary has the same shape as a multi-layer GeoPackage upload.
+        """
+        with self._open_upload(file, ".zip") as source:
+            members = list_zipped_shapefiles(source)
+            if not members:
+                return {"success": False, "error": "No .shp file found in zip archive"}
+
+            if len(members) == 1:
+                return self.process_shapefile(
+                    shp_path=zipped_shapefile(source, members[0]),
+                    layer_name=layer_name,
+                    db_session=db_session,
+                    description=description,
+                )
+
+            if self.write_mode != "insert":
+                return {
+                    "success": False,
+                    "error": f"Cannot {self.write_mode} a zip with {len(members)} shapefiles",
+                }
+            if self.resume_from:
+                return {"success": False, "error": "Multi-shapefile uploads cannot be resumed"}
+
+            logger.info(f"Processing {len(members)} shapefiles from zip archive")
+            # Checkpoints track a single layer, so they are not written here
+            upload_id, self.upload_id = self.upload_id, None
+            try:
+                processed_layers = []
+                for member in members:
+                    stem = Path(member).stem
+                    result = self.process_shapefile(
+                        shp_path=zipped_shapefile(source, member),
+                        layer_name=f"{layer_name}_{stem}" if layer_name else None,
+                        db_session=db_session,
+                        description=description,
+                    )
+                    processed_layers.append({**result, "source_layer": member})
+            finally:
+                self.upload_id = upload_id
+
+        successful_layers = [layer for layer in processed_layers if layer["success"]]
+        failed_layers = [layer for layer in processed_layers if not layer["success"]]
+
+        return {
+            "success": len(successful_layers) > 0,
+            "message": f"Processed {len(successful_layers)} layers successfully"
+            + (f", {len(failed_layers)} failed" if failed_layers else ""),
+            "processed_layers": processed_layers,
+            "total_layers": len(members),
+            "successful_layers": len(successful_layers),
+            "failed_layers": len(failed_layers),
+        }
+
+    def _fits_in_memory(self, files: Dict[str, Any]) -> bool:
+        """Check whether the uploaded components are small enough to read from memory"""
+        if any(isinstance(file, StagedFile) for file in files.values()):
+            return False
+
+        sizes = [upload_size(file) for file in files.values()]
+        return None not in sizes and sum(sizes) <= INGEST_CONFIG["in_memory_threshold"]
+
     def process_shapefile(
         self,
-        shp_path: Union[str, Path],
+        shp_path: Union[str, Path, bytes],
         layer_name: str,
         db_session: Session,
         description: str = "",
     ) -> Dict[str, Any]:
         """
         Process a shapefile and store it in the database
+
+        shp_path may also be the bytes of a zip archive containing the shapefile,
+        or a GDAL virtual path such as /vsizip/archive.zip/roads.shp
         """
         try:
-            # Convert to Path and verify existence
-            shp_path = Path(shp_path)
-            if not shp_path.exists():
-                raise FileNotFoundError(f"Shapefile not found at: {shp_path}")
-
-            logger.info(f"Reading shapefile from: {shp_path}")
+            if isinstance(shp_path, bytes):
+                logger.info(f"Reading zipped shapefile from memory ({len(shp_path)} bytes)")
+            elif str(shp_path).startswith("/vsi"):
+                logger.info(f"Reading shapefile in place from: {shp_path}")
+            else:
+                # Convert to Path and verify existence
+                shp_path = Path(shp_path)
+                if not shp_path.exists():
+                    raise FileNotFoundError(f"Shapefile not found at: {shp_path}")
+
+                logger.info(f"Reading shapefile from: {shp_path}")
             gdf = self._load_and_standardize_geodataframe(shp_path)
 
             # Determine geometry type
@@ -134,8 +239,8 @@ class ShapefileProcessor(BaseDataProcessor):
                 description = ai_analysis["suggested_description"]
 
             # Create the layer
-            layer = crud.create_spatial_layer(
-                db=db_session,
+            layer = self._create_layer(
+                db_session=db_session,
                 name=layer_name,
                 description=description,
                 geometry_type=geometry_type,
@@ -167,11 +272,13 @@ class ShapefileProcessor(BaseDataProcessor):
             logger.error(f"Error processing shapefile: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
-    def _load_and_standardize_geodataframe(self, file_path: Union[str, Path]) -> gpd.GeoDataFrame:
+    def _load_and_standardize_geodataframe(
+        self, file_path: Union[str, Path, bytes]
+    ) -> gpd.GeoDataFrame:
         """
         Load and standardize a GeoDataFrame from a file
         """
-        gdf = gpd.read_file(file_path)
+        gdf = read_vector(file_path)
 
         # Handle CRS
         gdf = standardize_crs(gdf)
@@ -181,39 +288,6 @@ class ShapefileProcessor(BaseDataProcessor):
 
         return gdf
 
-    def _process_features(self, gdf: gpd.GeoDataFrame, layer_id: int, db_session: Session) -> int:
-        """Process features from a GeoDataFrame into the database"""
-        features_added = 0
-        for idx, row in gdf.iterrows():
-            try:
-                geometry = row.geometry.__geo_interface__
-
-                # Clean properties before storing
-                properties = row.drop("geometry").to_dict()
-                cleaned_properties = {}
-
-                for key, value in properties.items():
-                    if pd.isna(value):  # Check for NaN or None
-                        cleaned_properties[key] = None
-                    elif isinstance(value, float) and math.isinf(value):
-                        cleaned_properties[key] = None
-                    else:
-                        cleaned_properties[key] = value
-
-                crud.add_feature(
-                    db=db_session,
-                    layer_id=layer_id,
-                    geometry=geometry,
-                    properties=cleaned_properties,
-                )
-                features_added += 1
-
-            except Exception as e:
-                logger.error(f"Error adding feature {idx}: {e}")
-                continue
-
-        return features_added
-
     def get_layer_as_geojson(self, layer_id: int, db_session: Session) -> Optional[Dict]:
         """
         Retrieve a layer from the database as GeoJSON
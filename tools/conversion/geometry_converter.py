@@ -1,6 +1,7 @@
 from typing import Union
+import numpy as np
 import geopandas as gpd
-from shapely.geometry import Point, LineString, Polygon, MultiPoint, MultiLineString, MultiPolygon
+import shapely
 from shapely.geometry.base import BaseGeometry
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
@@ -13,68 +14,65 @@ logger = setup_logger(
 
 
 def convert_to_2d(
-    geometry: Union[BaseGeometry, gpd.GeoSeries, gpd.GeoDataFrame]
-) -> Union[BaseGeometry, gpd.GeoSeries, gpd.GeoDataFrame]:
+    geometry: Union[BaseGeometry, np.ndarray, gpd.GeoSeries, gpd.GeoDataFrame]
+) -> Union[BaseGeometry, np.ndarray, gpd.GeoSeries, gpd.GeoDataFrame]:
     """
-    Convert 3D geometries to 2D by removing Z coordinates.
+    Convert 3D geometries to 2D by removing Z (and M) coordinates.
+
+    Arrays are converted in a single vectorized call; geometries that are
+    already 2D (and missing geometries) are passed through untouched, and
+    the input is returned as-is when nothing needs converting. All geometry
+    types are supported, including GeometryCollections.
 
     Args:
-        geometry: Input geometry, can be a Shapely geometry, GeoSeries, or GeoDataFrame
+        geometry: Input geometry, can be a Shapely geometry, array of geometries,
+            GeoSeries, or GeoDataFrame (whose active geometry column is converted)
 
     Returns:
         The input geometry converted to 2D
     """
     try:
-        if isinstance(geometry, (gpd.GeoDataFrame, gpd.GeoSeries)):
-            return geometry.apply(lambda geom: _convert_single_geometry_to_2d(geom))
-        else:
-            return _convert_single_geometry_to_2d(geometry)
+        if isinstance(geometry, gpd.GeoDataFrame):
+            geometries = convert_to_2d(geometry.geometry)
+            if geometries is geometry.geometry:
+                return geometry
+            result = geometry.copy()
+            result[geometry.geometry.name] = geometries
+            return result
+
+        if isinstance(geometry, gpd.GeoSeries):
+            values = _force_2d_array(geometry.values.to_numpy())
+            if values is None:
+                return geometry
+            return gpd.GeoSeries(values, index=geometry.index, crs=geometry.crs, name=geometry.name)
+
+        if isinstance(geometry, np.ndarray):
+            values = _force_2d_array(geometry)
+            return geometry if values is None else values
+
+        if geometry is None or shapely.get_coordinate_dimension(geometry) <= 2:
+            return geometry
+        return shapely.force_2d(geometry)
     except Exception as e:
         logger.error(f"Error converting geometry to 2D: {e}")
         raise
 
 
-def _convert_single_geometry_to_2d(geom: BaseGeometry) -> BaseGeometry:
+def _force_2d_array(values: np.ndarray) -> Union[np.ndarray, None]:
     """
-    Convert a single Shapely geometry from 3D to 2D.
+    Drop extra dimensions from the geometries in an array that have them.
 
     Args:
-        geom: Input Shapely geometry
+        values: Object array of Shapely geometries (may contain None)
 
     Returns:
-        2D version of the input geometry
+        New array with every geometry 2D, or None if all were already 2D
     """
-    if geom is None:
+    # 3 for XYZ or XYM, 4 for XYZM; -1 for missing geometries
+    needs_conversion = shapely.get_coordinate_dimension(values) > 2
+    if not needs_conversion.any():
         return None
 
-    # Get coordinates based on geometry type
-    if isinstance(geom, Point):
-        return Point(geom.x, geom.y)
-
-    elif isinstance(geom, LineString):
-        return LineString([(p[0], p[1]) for p in geom.coords])
-
-    elif isinstance(geom, Polygon):
-        exterior = [(p[0], p[1]) for p in geom.exterior.coords]
-        interiors = [[(p[0], p[1]) for p in interior.coords] for interior in geom.interiors]
-        return Polygon(exterior, interiors)
-
-    elif isinstance(geom, MultiPoint):
-        return MultiPoint([Point(p.x, p.y) for p in geom.geoms])
-
-    elif isinstance(geom, MultiLineString):
-        return MultiLineString(
-            [LineString([(p[0], p[1]) for p in line.coords]) for line in geom.geoms]
-        )
-
-    elif isinstance(geom, MultiPolygon):
-        polygons = []
-        for poly in geom.geoms:
-            exterior = [(p[0], p[1]) for p in poly.exterior.coords]
-            interiors = [[(p[0], p[1]) for p in interior.coords] for interior in poly.interiors]
-            polygons.append(Polygon(exterior, interiors))
-        return MultiPolygon(polygons)
-
-    else:
-        logger.warning(f"Unsupported geometry type: {type(geom)}")
-        return geom
+    result = np.array(values, dtype=object, copy=True)
+    result[needs_conversion] = shapely.force_2d(values[needs_conversion])
+    return result
@@ -107,7 +107,7 @@ class GeospatialDataGenerator:
         "grand_rapids": {"city": "Grand Rapids", "state": "Michigan", "country": "USA"}
     }
 
-    def __init__(self, data_type="points", region="seattle", num_points=1000):
+    def __init__(self, data_type="points", region="seattle", num_points=1000, boundary=None, graph=None):
         self.data_type = data_type
         self.region = region
         self.num_points = num_points
@@ -117,6 +117,12 @@ class GeospatialDataGenerator:
         self.graph = None
         self.street_network = None
 
+        # A boundary (and street graph for routes) given up front keeps generation offline
+        if boundary is not None:
+            self.boundary = self._ensure_crs(boundary)
+            self.graph = graph
+            return
+
         # Load cached data or create new
         try:
             self._load_cached_data()
@@ -0,0 +1,266 @@
+import codecs
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+import geopandas as gpd
+from utils.logger import setup_logger
+from config.logging_config import CURRENT_LOGGING_CONFIG
+
+logger = setup_logger(
+    "geojson_stream",
+    log_level=CURRENT_LOGGING_CONFIG["log_level"],
+    log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
+)
+
+ENCODINGS_TO_TRY = ["utf-8", "utf-8-sig", "latin-1", "cp1252"]
+READ_SIZE = 1024 * 1024  # 1MB of text per read
+TAIL_SIZE = 64 * 1024  # Bytes at the end of a file searched for a trailing "crs" member
+WHITESPACE = " \t\n\r"
+# Characters that can follow a complete JSON value
+VALUE_END = WHITESPACE + ",:]}"
+
+
+def detect_encoding(
+    file_path: Union[str, Path, bytes], sample_size: int = READ_SIZE
+) -> Optional[str]:
+    """
+    Detect the text encoding of a GeoJSON file from a sample of its first bytes
+
+    Args:
+        file_path: Path to the GeoJSON file, or its contents
+        sample_size: Number of bytes to sample
+
+    Returns:
+        Name of the first encoding that decodes the sample, or None
+    """
+    if isinstance(file_path, (bytes, bytearray)):
+        sample = bytes(file_path[:sample_size])
+    else:
+        with open(file_path, "rb") as f:
+            sample = f.read(sample_size)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+
+    for encoding in ENCODINGS_TO_TRY:
+        try:
+            # Incremental decoding tolerates a multi-byte character cut at the sample end
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+class _StreamingJSONReader:
+    """Incrementally decode JSON values from a text file without loading it whole"""
+
+    def __init__(self, handle, read_size: int = READ_SIZE):
+        self.handle = handle
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int = None) -> bool:
+        """Append the next chunk of text to the buffer, returning False at end of file"""
+        if self.eof:
+            return False
+
+        chunk = self.handle.read(size or self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        # Drop consumed text so the buffer stays bounded
+        if self.pos:
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of GeoJSON file")
+
+    def expect(self, char: str) -> None:
+        """Consume the next non-whitespace character, which must be char"""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid GeoJSON: expected '{char}' but found '{found}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode and consume the next complete JSON value"""
+        self.peek()
+        read_size = self.read_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number cut at the end of the buffer (e.g. "1." or "2e") decodes
+                # to a prefix of itself, so it is only complete before a delimiter
+                if (end < len(self.buffer) and self.buffer[end] in VALUE_END) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                pass
+
+            # Grow reads geometrically so very large values are not re-parsed too often
+            if not self._fill(read_size):
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                self.pos = end
+                return value
+            read_size *= 2
+
+
+def iter_geojson_features(
+    file_path: Union[str, Path, bytes], encoding: str = "utf-8"
+) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    Incrementally parse a GeoJSON FeatureCollection
+
+    Members that precede the "features" array (such as "crs") are parsed
+    before this function returns; features are then decoded one at a time,
+    so memory use is bounded by the size of a single feature. Members that
+    follow the array are added to the returned header once the feature
+    iterator is exhausted.
+
+    Args:
+        file_path: Path to the GeoJSON file, or its contents
+        encoding: Text encoding of the file
+
+    Returns:
+        Tuple of (collection members read before "features", feature iterator)
+    """
+    if isinstance(file_path, (bytes, bytearray)):
+        handle = io.TextIOWrapper(io.BytesIO(file_path), encoding=encoding)
+    else:
+        handle = open(file_path, "r", encoding=encoding)
+    reader = _StreamingJSONReader(handle)
+
+    try:
+        reader.expect("{")
+        header = {}
+
+        while True:
+            if reader.peek() == "}":
+                handle.close()
+                if header.get("type") == "Feature":
+                    return header, iter([header])
+                return header, iter([])
+
+            key = reader.value()
+            reader.expect(":")
+            if key == "features":
+                break
+
+            header[key] = reader.value()
+            if reader.peek() == ",":
+                reader.pos += 1
+    except Exception:
+        handle.close()
+        raise
+
+    def features() -> Iterator[Dict[str, Any]]:
+        try:
+            reader.expect("[")
+            if reader.peek() != "]":
+                while True:
+                    yield reader.value()
+                    if reader.peek() == "]":
+                        break
+                    reader.expect(",")
+            reader.expect("]")
+
+            try:
+                while reader.peek() == ",":
+                    reader.pos += 1
+                    key = reader.value()
+                    reader.expect(":")
+                    header[key] = reader.value()
+            except ValueError as e:
+                logger.warning(f"Ignoring unreadable GeoJSON members after the features: {e}")
+        finally:
+            handle.close()
+
+    return header, features()
+
+
+def iter_geojson_batches(
+    file_path: Union[str, Path, bytes], batch_size: int, encoding: str = "utf-8"
+) -> Iterator[gpd.GeoDataFrame]:
+    """
+    Read a GeoJSON FeatureCollection as a sequence of GeoDataFrame batches
+
+    Args:
+        file_path: Path to the GeoJSON file, or its contents
+        batch_size: Number of features per batch
+        encoding: Text encoding of the file
+
+    Yields:
+        GeoDataFrames of at most batch_size features
+    """
+    header, features = iter_geojson_features(file_path, encoding)
+    crs = _crs_from_header(header)
+    if "crs" not in header and _tail_mentions_crs(file_path):
+        # A legacy "crs" member after the features still applies to all of them
+        members = _read_all_members(file_path, encoding)
+        if "crs" in members:
+            crs = _crs_from_header(members)
+            logger.warning(f"GeoJSON declares its crs ({crs}) after the features")
+
+    batch = []
+    for feature in features:
+        batch.append(feature)
+        if len(batch) >= batch_size:
+            yield gpd.GeoDataFrame.from_features(batch, crs=crs)
+            batch = []
+
+    # The tail search can miss a "crs" member followed by very large ones
+    if "crs" in header and _crs_from_header(header) != crs:
+        raise ValueError(
+            f"GeoJSON crs member after the features ({_crs_from_header(header)}) "
+            f"contradicts the crs the features were read in ({crs}); "
+            'move it before "features"'
+        )
+
+    if batch:
+        yield gpd.GeoDataFrame.from_features(batch, crs=crs)
+
+
+def _tail_mentions_crs(file_path: Union[str, Path, bytes]) -> bool:
+    """Check whether the end of a GeoJSON file contains a "crs" key"""
+    if isinstance(file_path, (bytes, bytearray)):
+        tail = bytes(file_path[-TAIL_SIZE:])
+    else:
+        with open(file_path, "rb") as f:
+            f.seek(max(f.seek(0, io.SEEK_END) - TAIL_SIZE, 0))
+            tail = f.read()
+    return b'"crs"' in tail
+
+
+def _read_all_members(file_path: Union[str, Path, bytes], encoding: str) -> Dict[str, Any]:
+    """Read every FeatureCollection member other than the features, in one streaming pass"""
+    header, features = iter_geojson_features(file_path, encoding)
+    for _ in features:
+        pass
+    return header
+
+
+def _crs_from_header(header: Dict[str, Any]) -> str:
+    """Get the CRS declared by a legacy GeoJSON "crs" member, defaulting to WGS84"""
+    try:
+        name = header.get("crs", {}).get("properties", {}).get("name")
+        if name:
+            return name
+    except AttributeError:
+        logger.warning("Ignoring malformed GeoJSON crs member")
+    return "EPSG:4326"
@@ -0,0 +1,124 @@
+import codecs
+import io
+import posixpath
+import zipfile
+from pathlib import Path
+from typing import Any, List, Optional, Union
+import geopandas as gpd
+import pyogrio
+from utils.logger import setup_logger
+from config.logging_config import CURRENT_LOGGING_CONFIG
+
+logger = setup_logger(
+    "vector_readers",
+    log_level=CURRENT_LOGGING_CONFIG["log_level"],
+    log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
+)
+
+try:
+    import pyarrow  # noqa: F401
+
+    USE_ARROW = True
+except ImportError:
+    logger.warning("pyarrow is not installed, vector files will be read without Arrow")
+    USE_ARROW = False
+
+
+def read_vector(
+    source: Union[str, Path, bytes],
+    layer: Optional[Union[str, int]] = None,
+    columns: Optional[List[str]] = None,
+    **kwargs: Any,
+) -> gpd.GeoDataFrame:
+    """
+    Read a vector dataset into a GeoDataFrame through pyogrio's Arrow interface
+
+    GDAL hands features over as Arrow record batches with WKB geometries,
+    which are decoded in one vectorized call instead of feature by feature.
+    The resulting geometry column stays a Shapely array, so CRS
+    transformation, validation and WKB encoding for the database all run
+    column-wise.
+
+    Args:
+        source: Path to the dataset, or its contents as bytes
+        layer: Layer name or index for multi-layer formats such as GeoPackage
+        columns: Attribute columns to read (all when None)
+        **kwargs: Additional options passed to pyogrio.read_dataframe, e.g. encoding
+
+    Returns:
+        GeoDataFrame with the dataset's features and CRS
+    """
+    use_arrow = USE_ARROW
+    encoding = kwargs.get("encoding")
+    if encoding:
+        if codecs.lookup(encoding).name in ("utf-8", "utf-8-sig"):
+            # GDAL skips a UTF-8 byte order mark on its own
+            kwargs["encoding"] = "utf-8"
+        else:
+            # The Arrow interface only returns UTF-8 text
+            use_arrow = False
+
+    return pyogrio.read_dataframe(
+        source, layer=layer, columns=columns, use_arrow=use_arrow, **kwargs
+    )
+
+
+def list_zipped_shapefiles(source: Union[str, Path, bytes]) -> List[str]:
+    """
+    List the shapefiles in a zip archive, including those in subdirectories
+
+    GDAL's /vsizip/ directory listing only reports shapefiles at the top
+    level of an archive, so members are enumerated from the zip index.
+    macOS resource forks and hidden files are skipped.
+
+    Args:
+        source: Path to the zip archive, or its contents as bytes
+
+    Returns:
+        Archive member names of the .shp files, in archive order
+    """
+    with zipfile.ZipFile(_zip_source(source)) as archive:
+        return [
+            name
+            for name in archive.namelist()
+            if name.lower().endswith(".shp")
+            and not name.startswith("__MACOSX/")
+            and not posixpath.basename(name).startswith(".")
+        ]
+
+
+def zipped_shapefile(source: Union[str, Path, bytes], member: str) -> Union[str, bytes]:
+    """
+    Get a source read_vector can open for one shapefile inside a zip archive
+
+    Archives on disk are read in place through a /vsizip/ path. For an
+    archive in memory, the shapefile's sidecar files (.shx, .dbf, .prj,
+    .cpg, ...) are repacked into a zip of their own, since GDAL opens bytes
+    as a whole dataset rather than by member path.
+
+    Args:
+        source: Path to the zip archive, or its contents as bytes
+        member: Archive member name of the .shp file
+
+    Returns:
+        /vsizip/ path or zip archive bytes containing only that shapefile
+    """
+    if not isinstance(source, (bytes, bytearray)):
+        return f"/vsizip/{Path(source).resolve().as_posix()}/{member}"
+
+    stem = posixpath.splitext(member)[0].lower()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(source)) as archive, zipfile.ZipFile(
+        buffer, "w", compression=zipfile.ZIP_STORED
+    ) as shapefile:
+        for info in archive.infolist():
+            if posixpath.splitext(info.filename)[0].lower() == stem:
+                shapefile.writestr(posixpath.basename(info.filename), archive.read(info))
+    return buffer.getvalue()
+
+
+def _zip_source(source: Union[str, Path, bytes]) -> Union[str, Path, io.BytesIO]:
+    """Wrap archive bytes so zipfile can read them"""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
@@ -0,0 +1,146 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+READ_SIZE = 1024 * 1024  # 1MB per read when hashing
+
+
+class StagedFile:
+    """An uploaded file already written to disk, usable wherever a FileStorage is expected"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.filename = self.path.name
+
+    def read(self) -> bytes:
+        return self.path.read_bytes()
+
+    def save(self, dst) -> None:
+        """Expose the staged file at dst, hard-linking instead of copying when possible"""
+        dst = Path(dst)
+        if dst.exists():
+            dst.unlink()
+        try:
+            os.link(self.path, dst)
+        except OSError:
+            shutil.copyfile(self.path, dst)
+
+
+class InMemoryFile:
+    """An uploaded file held in memory, usable wherever a FileStorage is expected"""
+
+    def __init__(self, filename: str, data: bytes):
+        self.filename = filename
+        self.data = data
+
+    def read(self) -> bytes:
+        return self.data
+
+    def save(self, dst) -> None:
+        Path(dst).write_bytes(self.data)
+
+
+def upload_size(file: Any) -> Optional[int]:
+    """
+    Get the size in bytes of an uploaded file without reading it
+
+    Args:
+        file: FileStorage, StagedFile or InMemoryFile
+
+    Returns:
+        Size in bytes, or None if it cannot be determined
+    """
+    if isinstance(file, StagedFile):
+        return file.path.stat().st_size
+    if isinstance(file, InMemoryFile):
+        return len(file.data)
+
+    stream = getattr(file, "stream", None)
+    try:
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return getattr(file, "content_length", None) or None
+
+
+def zip_in_memory(members: Dict[str, Any]) -> bytes:
+    """
+    Bundle uploaded files into an uncompressed zip archive held in memory
+
+    GDAL reads the archive through /vsizip/, which lets multi-file formats
+    such as shapefiles be opened without writing their parts to disk.
+
+    Args:
+        members: Mapping of archive member name to uploaded file
+
+    Returns:
+        The zip archive as bytes
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, file in members.items():
+            archive.writestr(name, file.read())
+    return buffer.getvalue()
+
+
+def source_size(source: Any) -> int:
+    """Get the size in bytes of an upload opened as bytes or a path"""
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    return Path(source).stat().st_size
+
+
+def content_hash(files: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Fingerprint a set of uploaded files by their contents and processing options
+
+    Files are hashed in fixed-size reads, so memory use does not depend on
+    upload size. Each file contributes its form field name and SHA-256
+    digest, so the same content under different file names hashes equally.
+    The options are hashed too, as the same file read with e.g. other
+    coordinate columns or another GeoPackage layer yields different layers.
+
+    Args:
+        files: Mapping of form field name to uploaded file
+        options: Options the files are processed with
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for key in sorted(files):
+        file_digest = hashlib.sha256()
+        for chunk in _iter_chunks(files[key]):
+            file_digest.update(chunk)
+        digest.update(f"{key}:{file_digest.hexdigest()}\n".encode())
+    if options:
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _iter_chunks(file: Any) -> Iterator[bytes]:
+    """Read an uploaded file in chunks, leaving its stream rewound"""
+    if isinstance(file, StagedFile):
+        with open(file.path, "rb") as f:
+            yield from iter(lambda: f.read(READ_SIZE), b"")
+        return
+    if isinstance(file, InMemoryFile):
+        view = memoryview(file.data)
+        for start in range(0, len(view), READ_SIZE):
+            yield view[start : start + READ_SIZE]
+        return
+
+    stream = file.stream
+    stream.seek(0)
+    try:
+        yield from iter(lambda: stream.read(READ_SIZE), b"")
+    finally:
+        stream.seek(0)
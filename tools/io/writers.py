@@ -0,0 +1,238 @@
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Sequence, Union
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyogrio
+from utils.logger import setup_logger
+from config.logging_config import CURRENT_LOGGING_CONFIG
+
+logger = setup_logger(
+    "vector_writers",
+    log_level=CURRENT_LOGGING_CONFIG["log_level"],
+    log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
+)
+
+# Binary export formats: file extension and media type
+EXPORT_FORMATS = {
+    "fgb": {"extension": ".fgb", "mimetype": "application/flatgeobuf"},
+    "parquet": {"extension": ".parquet", "mimetype": "application/vnd.apache.parquet"},
+    "arrow": {"extension": ".arrow", "mimetype": "application/vnd.apache.arrow.stream"},
+}
+
+# Arrow types of the property types reported by crud.get_layer_property_types
+PROPERTY_TYPES = {
+    "integer": pa.int64(),
+    "float": pa.float64(),
+    "boolean": pa.bool_(),
+    "string": pa.string(),
+}
+
+# Layer geometry types as stored by the processors, and their OGC names
+GEOMETRY_TYPES = {
+    "POINT": "Point",
+    "LINESTRING": "LineString",
+    "POLYGON": "Polygon",
+    "MULTIPOINT": "MultiPoint",
+    "MULTILINESTRING": "MultiLineString",
+    "MULTIPOLYGON": "MultiPolygon",
+    "GEOMETRYCOLLECTION": "GeometryCollection",
+}
+
+GEOMETRY_COLUMN = "geometry"
+WRITE_SIZE = 1024 * 1024  # Bytes read from a finished file per chunk
+
+
+def feature_schema(
+    property_types: Dict[str, str],
+    geometry_type: Optional[str] = None,
+    id_column: Optional[str] = "id",
+) -> pa.Schema:
+    """
+    Build the Arrow schema of exported features
+
+    The geometry column holds WKB in longitude/latitude, tagged with the
+    geoarrow.wkb extension type and GeoParquet metadata so readers
+    recognise it without extra options.
+
+    Args:
+        property_types: Property name to "integer", "float", "boolean" or "string"
+        geometry_type: Geometry type of the layer, e.g. "MULTIPOLYGON" (None or mixed for any)
+        id_column: Name of the feature ID column (None to leave it out)
+
+    Returns:
+        Schema with the ID, the properties and the geometry, in that order
+    """
+    fields = [pa.field(id_column, pa.int64(), nullable=False)] if id_column else []
+    fields += [pa.field(name, PROPERTY_TYPES[kind]) for name, kind in property_types.items()]
+    fields.append(
+        pa.field(
+            GEOMETRY_COLUMN,
+            pa.binary(),
+            metadata={
+                "ARROW:extension:name": "geoarrow.wkb",
+                "ARROW:extension:metadata": json.dumps({"crs": "OGC:CRS84"}),
+            },
+        )
+    )
+
+    ogc_type = GEOMETRY_TYPES.get((geometry_type or "").upper())
+    geo = {
+        "version": "1.1.0",
+        "primary_column": GEOMETRY_COLUMN,
+        # A missing crs means OGC:CRS84, i.e. WGS 84 longitude/latitude
+        "columns": {
+            GEOMETRY_COLUMN: {"encoding": "WKB", "geometry_types": [ogc_type] if ogc_type else []}
+        },
+    }
+    return pa.schema(fields, metadata={"geo": json.dumps(geo)})
+
+
+def record_batches(
+    rows: Iterable[Sequence[Sequence[Any]]], schema: pa.Schema
+) -> Iterator[pa.RecordBatch]:
+    """
+    Turn batches of row tuples into Arrow record batches
+
+    Args:
+        rows: Batches of rows whose values follow the schema's fields
+        schema: Schema from feature_schema
+
+    Yields:
+        One record batch per batch of rows
+    """
+    geometry_index = schema.get_field_index(GEOMETRY_COLUMN)
+    for batch in rows:
+        columns = list(zip(*batch)) or [()] * len(schema)
+        arrays = []
+        for index, (field, values) in enumerate(zip(schema, columns)):
+            if index == geometry_index:
+                # Database drivers hand bytea over as memoryview
+                values = [bytes(value) if value is not None else None for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_features(
+    batches: Iterable[pa.RecordBatch],
+    schema: pa.Schema,
+    fmt: str,
+    destination: Union[str, Path, BinaryIO],
+) -> None:
+    """
+    Write features in a binary export format
+
+    Arrow IPC and GeoParquet are written batch by batch. FlatGeobuf is
+    written by GDAL with its packed Hilbert R-tree index, so clients can
+    fetch just the features of an area with HTTP range requests; building
+    the index needs every feature, which GDAL spools to a temporary file.
+
+    Args:
+        batches: Record batches following the schema
+        schema: Schema from feature_schema
+        fmt: "fgb", "parquet" or "arrow"
+        destination: File path, or a binary file object (for Arrow IPC and GeoParquet)
+    """
+    if fmt == "arrow":
+        with pa.ipc.new_stream(destination, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    elif fmt == "parquet":
+        with pq.ParquetWriter(destination, schema, compression="zstd") as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    elif fmt == "fgb":
+        if not isinstance(destination, (str, Path)):
+            raise ValueError("FlatGeobuf can only be written to a file path")
+        geometry_types = json.loads(schema.metadata[b"geo"])["columns"][GEOMETRY_COLUMN][
+            "geometry_types"
+        ]
+        pyogrio.write_arrow(
+            pa.RecordBatchReader.from_batches(schema, batches),
+            str(destination),
+            driver="FlatGeobuf",
+            geometry_name=GEOMETRY_COLUMN,
+            geometry_type=geometry_types[0] if geometry_types else "Unknown",
+            crs="EPSG:4326",
+            layer_options={"SPATIAL_INDEX": "YES"},
+        )
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def iter_features(
+    batches: Iterable[pa.RecordBatch], schema: pa.Schema, fmt: str
+) -> Iterator[bytes]:
+    """
+    Write features in a binary export format, yielding the output as it is produced
+
+    Arrow IPC and GeoParquet output is yielded after each batch. FlatGeobuf
+    is written to a temporary file first, as its index precedes the features.
+
+    Args:
+        batches: Record batches following the schema
+        schema: Schema from feature_schema
+        fmt: "fgb", "parquet" or "arrow"
+
+    Yields:
+        Consecutive pieces of the file
+    """
+    if fmt == "fgb":
+        fd, path = tempfile.mkstemp(suffix=EXPORT_FORMATS[fmt]["extension"])
+        os.close(fd)
+        try:
+            write_features(batches, schema, fmt, path)
+            with open(path, "rb") as f:
+                while chunk := f.read(WRITE_SIZE):
+                    yield chunk
+        finally:
+            try:
+                os.unlink(path)
+            except OSError as e:
+                logger.warning(f"Failed to delete temporary file {path}: {e}")
+        return
+
+    sink = _DrainingSink()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+    elif fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    with writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    # The end of stream marker, or the Parquet footer
+    yield sink.drain()
+
+
+class _DrainingSink(io.RawIOBase):
+    """Write-only file object whose contents are taken out as they are written"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        """Take out everything written since the last call"""
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
@@ -1,5 +1,10 @@
 import geopandas as gpd
-from typing import Tuple
+import numpy as np
+import shapely
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config.ingest_config import INGEST_CONFIG
 from utils.logger import setup_logger
 from config.logging_config import CURRENT_LOGGING_CONFIG
 
@@ -9,24 +14,143 @@ logger = setup_logger(
     log_dir=CURRENT_LOGGING_CONFIG["log_dir"],
 )
 
+POLYGONAL_TYPE_IDS = (3, 6)  # Polygon, MultiPolygon
 
-def validate_and_fix_geometries(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+
+def validate_and_fix_geometries(
+    gdf: gpd.GeoDataFrame, max_workers: Optional[int] = None
+) -> gpd.GeoDataFrame:
     """
     Validate and fix invalid geometries in a GeoDataFrame
+
+    Only invalid geometries are repaired; valid ones are left untouched.
+    See repair_geometries for details.
     """
     try:
-        invalid_geometries = gdf[~gdf.geometry.is_valid]
-        if len(invalid_geometries) > 0:
+        repaired, report = repair_geometries(gdf.geometry.values.to_numpy(), max_workers)
+        if report["invalid"] > 0:
             logger.warning(
-                f"Found {len(invalid_geometries)} invalid geometries. Attempting to fix..."
+                f"Found {report['invalid']} invalid geometries, repaired {report['repaired']}"
+                f" ({report['fallback']} with buffer(0)), {report['unrepaired']} left as is."
+                f" Reasons: {report['reasons']}"
             )
-            gdf.geometry = gdf.geometry.buffer(0)
+            gdf[gdf.geometry.name] = gpd.GeoSeries(repaired, index=gdf.index, crs=gdf.crs)
         return gdf
     except Exception as e:
         logger.error(f"Error fixing geometries: {e}")
         raise
 
 
+def repair_geometries(
+    geometries: np.ndarray, max_workers: Optional[int] = None
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Repair the invalid geometries in an array
+
+    Validity is checked for every geometry, but only the invalid ones are
+    repaired: with make_valid, falling back to buffer(0) when make_valid
+    fails or leaves a polygon without any area. Polygonal geometries keep
+    only the polygonal parts of the repaired result, so a layer's geometry
+    type does not change. Large arrays are processed in chunks by a thread
+    pool; Shapely releases the GIL, so the chunks run in parallel without
+    copying geometries between processes.
+
+    Args:
+        geometries: Object array of Shapely geometries (may contain None)
+        max_workers: Threads used for large arrays (defaults to GEOMETRY_REPAIR_WORKERS)
+
+    Returns:
+        Tuple of (array with invalid geometries replaced, repair report). The
+        report counts checked, invalid, repaired, fallback (repaired with
+        buffer(0)) and unrepaired geometries, plus invalid geometries per reason.
+    """
+    max_workers = max_workers or INGEST_CONFIG["geometry_repair_workers"]
+    chunk_size = INGEST_CONFIG["geometry_repair_chunk_size"]
+
+    valid = np.concatenate(_map_chunks(shapely.is_valid, geometries, max_workers, chunk_size))
+    invalid_index = np.flatnonzero(~valid & ~shapely.is_missing(geometries))
+
+    report = {
+        "checked": len(geometries),
+        "invalid": len(invalid_index),
+        "repaired": 0,
+        "fallback": 0,
+        "unrepaired": 0,
+        "reasons": {},
+    }
+    if not len(invalid_index):
+        return geometries, report
+
+    invalid = geometries[invalid_index]
+    reasons = shapely.is_valid_reason(invalid)
+    # Reasons end with the location of the problem, e.g. "Self-intersection[0.5 0.5]"
+    report["reasons"] = dict(Counter(reason.split("[")[0] for reason in reasons))
+
+    results = _map_chunks(_repair_chunk, invalid, max_workers, chunk_size)
+    repaired = np.concatenate([chunk for chunk, _ in results])
+    fallback = np.concatenate([chunk for _, chunk in results])
+    still_invalid = ~shapely.is_valid(repaired)
+
+    report["fallback"] = int(fallback.sum())
+    report["unrepaired"] = int(still_invalid.sum())
+    report["repaired"] = report["invalid"] - report["unrepaired"]
+
+    result = np.array(geometries, dtype=object, copy=True)
+    fixed = ~still_invalid
+    result[invalid_index[fixed]] = repaired[fixed]
+    return result, report
+
+
+def _repair_chunk(invalid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Repair invalid geometries, returning the results and a mask of buffer(0) fallbacks"""
+    try:
+        repaired = shapely.make_valid(invalid)
+    except shapely.errors.GEOSException:
+        repaired = np.array([_make_valid_or_none(geom) for geom in invalid], dtype=object)
+
+    polygonal = np.isin(shapely.get_type_id(invalid), POLYGONAL_TYPE_IDS)
+    collections = polygonal & ~np.isin(shapely.get_type_id(repaired), POLYGONAL_TYPE_IDS)
+    for i in np.flatnonzero(collections & ~shapely.is_missing(repaired)):
+        repaired[i] = _polygonal_parts(repaired[i])
+
+    fallback = shapely.is_missing(repaired) | (polygonal & shapely.is_empty(repaired))
+    if fallback.any():
+        repaired[fallback] = shapely.buffer(invalid[fallback], 0)
+    return repaired, fallback
+
+
+def _make_valid_or_none(geom):
+    """make_valid for a single geometry, returning None if GEOS cannot repair it"""
+    try:
+        return shapely.make_valid(geom)
+    except shapely.errors.GEOSException:
+        return None
+
+
+def _polygonal_parts(geom):
+    """Keep the polygons of a repaired geometry, dropping parts that collapsed to lines or points"""
+    parts = shapely.get_parts(geom)
+    polygons = parts[np.isin(shapely.get_type_id(parts), POLYGONAL_TYPE_IDS)]
+    if not len(polygons):
+        return shapely.Polygon()
+    return shapely.union_all(polygons)
+
+
+def _map_chunks(
+    func: Callable[[np.ndarray], Any],
+    values: np.ndarray,
+    max_workers: int,
+    chunk_size: int,
+) -> List[Any]:
+    """Apply a vectorized function to chunks of an array, in parallel when there are several"""
+    chunks = [values[start : start + chunk_size] for start in range(0, len(values), chunk_size)]
+    if max_workers <= 1 or len(chunks) <= 1:
+        return [func(chunk) for chunk in chunks] or [func(values)]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        return list(executor.map(func, chunks))
+
+
 def check_geometry_types(gdf: gpd.GeoDataFrame):
     """
     Check geometry types and determine if they're mixed